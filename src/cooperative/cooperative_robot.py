@@ -1,37 +1,79 @@
+import heapq
+import math
+import time
+import numpy as np
 import pygame
+from collections import deque
 from src.settings import *
 from src.robot.robot import Robot
+from src.environment.env import InkLayer, DirtyRects
+from src.utils.fonts import render_text
+from src.utils.path_buffer import PathBuffer
 from src.text.text_engine import TextEngine
+from src.planning.scheduler import travel_ticks, split_by_time, group_time
+from src.planning.collision import SeparationPlanner
+from src.planning.motion import arrival_ticks
 
 class CooperativeRobot:
-    def __init__(self, screen, text_engine):
+    def __init__(self, screen, text_engine, num_robots=COOP_ROBOTS):
         self.screen = screen
         self.text_engine = text_engine
-        
-        # Robots
-        self.robot1 = Robot()
-        self.robot2 = Robot()
-        
-        # Paths and indices
-        self.robot1_path = []
-        self.robot2_path = []
-        self.robot1_index = 0
-        self.robot2_index = 0
+        self.num_robots = num_robots
+        self.work_stealing = COOP_WORK_STEALING
+        self.on_page_complete = None  # called with a draw(surface) function before a sheet is replaced
+        self.dirty = DirtyRects()  # what changed on screen since the last frame
         
         # Text variables
         self.user_text = ""
         self.text_entered = False
         
+        self._create_robots()
+    
+    def _create_robots(self):
+        """Fresh robots with empty paths"""
+        self.robots = [Robot() for _ in range(self.num_robots)]
+        
+        # Paths and indices, one per robot; a path grows by one stroke per letter its robot claims
+        self.paths = [PathBuffer(pen=True) for _ in range(self.num_robots)]
+        self.indices = [0] * self.num_robots
+        
+        # Ink each robot has put on the current sheet, every segment is drawn once when reached
+        self.inks = [InkLayer(PAPER_RECT.inflate(6, 6)) for _ in range(self.num_robots)]
+        
+        # Letters not yet claimed, queued per robot as (char, points, ticks) tasks
+        self.queues = [deque() for _ in range(self.num_robots)]
+        self.page_points = 0
+        
+        # Work statistics, in ticks
+        self.busy_ticks = [0] * self.num_robots
+        self.idle_ticks = [0] * self.num_robots
+        self.total_ticks = 0
+        self.planned_ticks = 0
+        self.page_start_tick = 0
+        self.skip_to = 0  # skipped ticks not caught up yet, see advance()
+        self.page_makespans = None  # planned ticks of every page, worked out for the ETA
+        self.steals = 0
+        self.reported = False
+        
+        # Keeps robots from running into each other on the shared sheet
+        self.planner = SeparationPlanner(self.num_robots) if COOP_COLLISION_AVOIDANCE else None
+        
+        # Pages of the laid out text, all robots share one sheet at a time
+        self.pages = []
+        self.page = 0
+        self.robot_chars = [""] * self.num_robots
+        self.estimated_ticks = [0] * self.num_robots
+        
     def reset(self):
         """Reset all cooperative mode variables"""
         self.user_text = ""
         self.text_entered = False
-        self.robot1_path = []
-        self.robot2_path = []
-        self.robot1_index = 0
-        self.robot2_index = 0
-        self.robot1 = Robot()
-        self.robot2 = Robot()
+        self._create_robots()
+    
+    def set_robot_count(self, num_robots):
+        """Change how many robots share the work"""
+        self.num_robots = max(1, min(num_robots, MAX_COOP_ROBOTS))
+        self._create_robots()
     
     def set_text(self, text):
         """Set the text to be drawn"""
@@ -49,43 +91,266 @@ class CooperativeRobot:
                     return True
                 elif event.key == pygame.K_BACKSPACE:
                     self.user_text = self.user_text[:-1]
+                elif event.key == pygame.K_UP:
+                    self.set_robot_count(self.num_robots + 1)
+                elif event.key == pygame.K_DOWN:
+                    self.set_robot_count(self.num_robots - 1)
+                elif event.key == pygame.K_TAB:
+                    self.work_stealing = not self.work_stealing
                 else:
                     self.user_text += event.unicode
         return False
     
     def update(self):
         """Update cooperative robots movement"""
-        # Move robot 1 
-        if self.robot1_index < len(self.robot1_path):
-            target_x, target_y, pen = self.robot1_path[self.robot1_index]
-            self.robot1.move_to(target_x, target_y)
-            
-            if (round(self.robot1.x), round(self.robot1.y)) == (round(target_x), round(target_y)):
-                self.robot1_index += 1
+        if not self.pages or self.is_complete():
+            return
         
-        # Move robot 2 
-        if self.robot2_index < len(self.robot2_path):
-            target_x, target_y, pen = self.robot2_path[self.robot2_index]
-            self.robot2.move_to(target_x, target_y)
+        self.total_ticks += 1
+        targets = [None] * self.num_robots
+        pens = [False] * self.num_robots
+        parking = [False] * self.num_robots
+        for i in range(self.num_robots):
+            # Out of work: take the next letter from our own queue, or from a peer's
+            if self.indices[i] >= len(self.paths[i]) and not self._claim_task(i):
+                self.idle_ticks[i] += 1
+                # Idle robots clear the sheet so they don't block the ones still drawing
+                if self.planner is not None:
+                    targets[i] = self._parking_spot(i)
+                    parking[i] = True
+                continue
             
-            if (round(self.robot2.x), round(self.robot2.y)) == (round(target_x), round(target_y)):
-                self.robot2_index += 1
+            self.busy_ticks[i] += 1
+            target_x, target_y, pen = self.paths[i][self.indices[i]]
+            targets[i] = (target_x, target_y)
+            pens[i] = pen == 1
+        
+        # Coordinate the steps so robots keep their distance, or move straight to the targets
+        if self.planner is not None:
+            remaining = [len(self.paths[i]) - self.indices[i] + sum(task[2] for task in self.queues[i])
+                         for i in range(self.num_robots)]
+            positions = self.planner.plan(self.robots, targets, pens, remaining)
+        else:
+            positions = [robot.next_position(*target) if target else (robot.x, robot.y)
+                         for robot, target in zip(self.robots, targets)]
+        
+        for i, robot in enumerate(self.robots):
+            if targets[i] is None:
+                continue
+            robot.x, robot.y = positions[i]
+            if parking[i]:
+                continue
+            target_x, target_y = targets[i]
+            # within a pixel counts as there, the robot settles on the point like in vector mode
+            if abs(robot.x - target_x) < 1 and abs(robot.y - target_y) < 1:
+                robot.x, robot.y = target_x, target_y
+                self.indices[i] += 1
+                self._commit_segment(i)
+        
+        self._check_page()
+    
+    def _check_page(self):
+        """All robots are done with this sheet: move on to the next page, or report at the end"""
+        if self.is_page_complete():
+            if self.page < len(self.pages) - 1:
+                if self.on_page_complete is not None:
+                    self.on_page_complete(self.draw_ink)
+                self.page += 1
+                print(f"Cooperative: starting page {self.page + 1}/{len(self.pages)}")
+                self._start_page()
+            elif not self.reported:
+                self.reported = True
+                self._report_stats()
+    
+    def eta(self):
+        """Seconds left, from the planned makespan of this page and of every page after it.
+        
+        Plans don't include waiting for each other or detours, so this can run
+        a little short with collision avoidance on.
+        """
+        if self.page_makespans is None:
+            self.page_makespans = [self._page_makespan(page) for page in self.pages]
+        current = max(max(self.estimated_ticks, default=0) - (self.total_ticks - self.page_start_tick), 0)
+        if self.is_complete():
+            current = 0
+        return (current + sum(self.page_makespans[self.page + 1:])) / FPS
+    
+    def fast_forward(self, ticks):
+        """Skip `ticks` ticks ahead"""
+        self._skip(self.total_ticks + int(ticks))
+    
+    def finish(self):
+        """Skip to the finished drawing"""
+        self._skip(math.inf)
+    
+    def _skip(self, tick):
+        # without collision avoidance every robot follows its own timeline and can jump there;
+        # with it robots react to each other every tick, so the ticks are caught up over the next frames
+        if self.planner is None:
+            self._jump(tick)
+        else:
+            self.skip_to = max(self.skip_to, tick)
+    
+    def advance(self, budget=COOP_FRAME_BUDGET):
+        """One frame: a tick, plus skipped ones until the time budget is spent"""
+        self.update()
+        deadline = time.perf_counter() + budget
+        while self.total_ticks < self.skip_to and not self.is_complete() and time.perf_counter() < deadline:
+            self.update()
+    
+    def _jump(self, until):
+        """Move to tick `until` (or the end) without stepping, when nothing coordinates the robots"""
+        while self.pages and not self.is_complete() and self.total_ticks < until:
+            self._jump_page(until)
+    
+    def _jump_page(self, until):
+        """Advance the current page to tick `until`, or to its end if that comes first.
+        
+        Robots only affect each other when one runs out of work and claims a
+        letter, maybe from a peer's queue. Claims are replayed in (tick, robot)
+        order like update() makes them; between them every robot follows the
+        arrival ticks of its own path.
+        """
+        now = self.total_ticks
+        n = self.num_robots
+        # per robot: target points, where the robot heads to each from, the tick before it sets off, arrival ticks
+        targets, origins, departures, arrivals = ([[] for _ in range(n)] for _ in range(4))
+        ends = [now] * n  # tick each robot reaches the end of its work
+        positions = [(robot.x, robot.y) for robot in self.robots]
+        claims = []
+        
+        def plan(i, first, start_tick):
+            points = self.paths[i].points[first:]
+            origin = np.vstack((positions[i], points[:-1]))
+            reached = start_tick + np.cumsum(arrival_ticks(origin, points, tolerance=1))
+            targets[i].append(points)
+            origins[i].append(origin)
+            departures[i].append(np.concatenate(([start_tick], reached[:-1])))
+            arrivals[i].append(reached)
+            ends[i] = int(reached[-1])
+            positions[i] = tuple(points[-1])
+            # out of work on the tick after the last point
+            heapq.heappush(claims, (ends[i] + 1, i))
+        
+        for i in range(n):
+            if self.indices[i] < len(self.paths[i]):
+                plan(i, self.indices[i], now)
+            else:
+                heapq.heappush(claims, (now + 1, i))
+        
+        idle_from = [None] * n
+        while claims and claims[0][0] <= until:
+            tick, i = heapq.heappop(claims)
+            first = len(self.paths[i])
+            if self._claim_task(i):
+                plan(i, first, tick - 1)
+            else:
+                # queues only shrink, a robot that finds nothing stays idle for the rest of the page
+                idle_from[i] = tick
+        
+        page_end = max(ends)
+        stop = page_end if not any(self.queues) and page_end <= until else until
+        # a sheet turned over within the jump needs no ink, unless someone keeps the finished sheets
+        turned = stop == page_end and self.page < len(self.pages) - 1 and self.on_page_complete is None
+        
+        for i, robot in enumerate(self.robots):
+            self.busy_ticks[i] += min(ends[i], stop) - now
+            if idle_from[i] is not None:
+                self.idle_ticks[i] += stop - idle_from[i] + 1
+            if not targets[i]:
+                continue
+            reached = np.concatenate(arrivals[i])
+            count = int(np.searchsorted(reached, stop, side='right'))
+            if not turned:
+                self._commit_segments(i, self.indices[i], self.indices[i] + count)
+            self.indices[i] += count
+            if count == len(reached):
+                robot.x, robot.y = positions[i]
+                continue
+            # part way to the next point
+            origin = np.concatenate(origins[i])[count]
+            target = np.concatenate(targets[i])[count]
+            elapsed = stop - np.concatenate(departures[i])[count]
+            distance = math.hypot(*(target - origin))
+            travelled = min(elapsed * robot.speed, distance)
+            robot.x, robot.y = (origin + (target - origin) * (travelled / distance) if distance else origin).tolist()
+        
+        self.total_ticks = stop
+        self._check_page()
+    
+    
+    def _commit_segment(self, i):
+        """Put the segment robot i just finished on its ink layer"""
+        k = self.indices[i] - 1
+        path = self.paths[i]
+        if k > 0 and path[k][2]:
+            x1, y1, _ = path[k-1]
+            x2, y2, _ = path[k]
+            self.inks[i].line(self._robot_color(i), (x1, y1), (x2, y2), DRAWING_WIDTH)
+    
+    def _commit_segments(self, i, first, end):
+        """Put segments first..end - 1 of robot i's path on its ink layer at once"""
+        path = self.paths[i]
+        k = np.arange(max(first, 1), end)
+        k = k[path.pens[k] != 0]
+        for x1, y1, x2, y2 in np.hstack((path.points[k - 1], path.points[k])).tolist():
+            self.inks[i].line(self._robot_color(i), (x1, y1), (x2, y2), DRAWING_WIDTH)
+    
+    def _parking_spot(self, i):
+        """Place below the paper where robot i waits while it has nothing to draw"""
+        return (PAPER_RECT.left + 20 + i * ROBOT_SEPARATION * 2, PAPER_RECT.bottom + 25)
+    
+    def _claim_task(self, i):
+        """Append the next unclaimed letter to robot i's path; False when there is none"""
+        queue = self.queues[i]
+        if not queue and self.work_stealing:
+            # Steal the letter the busiest peer would reach last
+            victim = max(range(self.num_robots), key=lambda k: sum(task[2] for task in self.queues[k]))
+            if self.queues[victim]:
+                self.queues[i].append(self.queues[victim].pop())
+                self.steals += 1
+        if not queue:
+            return False
+        
+        char, points, _ = queue.popleft()
+        self.paths[i].add_stroke(points)
+        self.robot_chars[i] += char
+        return True
+    
+    def utilization(self, i):
+        """Share of ticks robot i spent drawing or travelling rather than waiting"""
+        ticks = self.busy_ticks[i] + self.idle_ticks[i]
+        return self.busy_ticks[i] / ticks if ticks else 0.0
+    
+    def _report_stats(self):
+        print(f"Cooperative: finished in {self.total_ticks / FPS:.1f}s, planned {self.planned_ticks / FPS:.1f}s "
+              f"({'with' if self.work_stealing else 'without'} work stealing, {self.steals} steals)")
+        for i in range(self.num_robots):
+            print(f"  Robot {i + 1}: utilization {self.utilization(i) * 100:.0f}%, "
+                  f"idle {self.idle_ticks[i] / FPS:.1f}s")
+        if self.planner is not None:
+            # Throughput spent on keeping the robots apart
+            waited = sum(self.planner.wait_ticks)
+            print(f"  Coordination: {waited / FPS:.1f}s waiting, "
+                  f"{sum(self.planner.detour_ticks) / FPS:.1f}s on detours, "
+                  f"{self.planner.forced_moves} forced moves, "
+                  f"{waited / max(sum(self.busy_ticks), 1) * 100:.1f}% of working time")
+            print(f"  Separation: closest {self.planner.closest_approach:.1f}px "
+                  f"(minimum {self.planner.min_separation}px), "
+                  f"{self.planner.violation_ticks} ticks with robots too close")
     
     def draw(self, back_button_callback):
         """Draw cooperative robots and text"""
-        self.screen.fill(WHITE)
+        self.dirty.show("background", self.screen.fill(WHITE))
         back_button_callback()
         
         # Display current mode
-        font = pygame.font.SysFont('Arial', 24)
-        mode_surface = font.render("Mode: Cooperative Robots", True, BLACK)
-        self.screen.blit(mode_surface, (WIDTH - 300, 20))
-        
-        font = pygame.font.SysFont('Arial', 32) 
+        mode_surface = render_text(f"Mode: Cooperative Robots ({self.num_robots})", 'Arial', 24)
+        self.dirty.show("mode", self.screen.blit(mode_surface, (WIDTH - 300, 20)), mode_surface)
         
         if not self.text_entered:
             # Show typing prompt
-            self._draw_typing_prompt(font)
+            self._draw_typing_prompt()
         else:
             # Draw completed lines
             self._draw_completed_lines()
@@ -97,189 +362,156 @@ class CooperativeRobot:
             self._draw_robots()
             
             # Show cooperation info
-            self._draw_cooperation_info(font)
+            self._draw_cooperation_info()
     
-    def _draw_typing_prompt(self, font):
+    def _draw_typing_prompt(self):
         """Draw typing prompt"""
-        prompt_surface = font.render("Enter text and press Enter:", True, BLACK)
-        self.screen.blit(prompt_surface, (50, 20))
-        input_surface = font.render(self.user_text, True, BLACK)
-        self.screen.blit(input_surface, (50, 60))
+        prompt_surface = render_text("Enter text and press Enter:", 'Arial', 32)
+        self.dirty.show("prompt", self.screen.blit(prompt_surface, (50, 20)), prompt_surface)
+        input_surface = render_text(self.user_text, 'Arial', 32)
+        self.dirty.show("input", self.screen.blit(input_surface, (50, 60)), input_surface)
+        
+        stealing = "on" if self.work_stealing else "off"
+        hint_surface = render_text(f"UP / DOWN: change number of robots, TAB: work stealing ({stealing})", 'Arial', 18)
+        self.dirty.show("hint", self.screen.blit(hint_surface, (50, 110)), hint_surface)
+    
+    def _robot_color(self, i):
+        return ROBOT_COLORS[i % len(ROBOT_COLORS)]
     
     def _draw_completed_lines(self):
-        """Draw completed lines for both robots"""
-        # Draw completed lines for robot 1 
-        for i in range(1, self.robot1_index):
-            if i < len(self.robot1_path):
-                x1, y1, pen1 = self.robot1_path[i-1]
-                x2, y2, pen2 = self.robot1_path[i]
-                if pen2:
-                    pygame.draw.line(self.screen, RED, (x1, y1), (x2, y2), DRAWING_WIDTH)
-        
-        # Draw completed lines for robot 2 
-        for i in range(1, self.robot2_index):
-            if i < len(self.robot2_path):
-                x1, y1, pen1 = self.robot2_path[i-1]
-                x2, y2, pen2 = self.robot2_path[i]
-                if pen2:
-                    pygame.draw.line(self.screen, BLUE, (x1, y1), (x2, y2), DRAWING_WIDTH)
+        """Draw completed lines for every robot"""
+        self.draw_ink(self.screen)
+    
+    def draw_ink(self, surface):
+        """Draw the ink of the current page onto any surface"""
+        for ink in self.inks:
+            ink.blit(surface)
+    
+    def dirty_rects(self):
+        """Regions changed since the last frame: new ink, moving robots and updated labels"""
+        rects = self.dirty.take()
+        for ink in self.inks:
+            rects.extend(ink.changes())
+        return rects
     
     def _draw_current_lines(self):
         """Draw current lines being drawn"""
-        # Draw current line for robot 1
-        if self.robot1_index > 0 and self.robot1_index < len(self.robot1_path):
-            prev_x, prev_y, _ = self.robot1_path[self.robot1_index-1]
-            pygame.draw.line(self.screen, RED, (prev_x, prev_y), 
-                          (self.robot1.x, self.robot1.y), DRAWING_WIDTH)
-        
-        # Draw current line for robot 2
-        if self.robot2_index > 0 and self.robot2_index < len(self.robot2_path):
-            prev_x, prev_y, _ = self.robot2_path[self.robot2_index-1]
-            pygame.draw.line(self.screen, BLUE, (prev_x, prev_y), 
-                          (self.robot2.x, self.robot2.y), DRAWING_WIDTH)
+        for i, (robot, path) in enumerate(zip(self.robots, self.paths)):
+            index = self.indices[i]
+            if index > 0 and index < len(path):
+                prev_x, prev_y, _ = path[index-1]
+                line_rect = pygame.draw.line(self.screen, self._robot_color(i), (prev_x, prev_y), 
+                                             (robot.x, robot.y), DRAWING_WIDTH)
+                self.dirty.show(("line", i), line_rect, (prev_x, prev_y, robot.x, robot.y))
     
     def _draw_robots(self):
-        """Draw both robots"""
-        # Robot 1 (Red)
-        pygame.draw.circle(self.screen, RED, (int(self.robot1.x), int(self.robot1.y)), 10)
-        pygame.draw.circle(self.screen, BLACK, (int(self.robot1.x), int(self.robot1.y)), 10, 2)
-        
-        # Robot 2 (Blue)
-        pygame.draw.circle(self.screen, BLUE, (int(self.robot2.x), int(self.robot2.y)), 10)
-        pygame.draw.circle(self.screen, BLACK, (int(self.robot2.x), int(self.robot2.y)), 10, 2)
+        """Draw every robot in its own color"""
+        for i, robot in enumerate(self.robots):
+            pygame.draw.circle(self.screen, self._robot_color(i), (int(robot.x), int(robot.y)), 10)
+            robot_rect = pygame.draw.circle(self.screen, BLACK, (int(robot.x), int(robot.y)), 10, 2)
+            self.dirty.show(("robot", i), robot_rect, self._robot_color(i))
     
-    def _draw_cooperation_info(self, font):
+    def _draw_cooperation_info(self):
         """Display cooperation information"""
-        status_font = pygame.font.SysFont('Arial', 18)
-        
         # Show final result
         result_x, result_y = 50, 50
-        title_surface = font.render("Final Result:", True, BLACK)
-        self.screen.blit(title_surface, (result_x, result_y - 40))
-        
-        text_length = len(self.user_text)
-        mid_point = text_length // 2
-        
-    
-        if text_length % 2 == 0:
-          
-            robot1_chars = self.user_text[:mid_point]
-            robot2_chars = self.user_text[mid_point:]
-        else:
-            
-            robot1_chars = self.user_text[:mid_point]
-            robot2_chars = self.user_text[mid_point:]
-        
-        robot1_info = f"Robot 1 (Red - First Half): '{robot1_chars}' ({len(robot1_chars)} chars)"
-        robot2_info = f"Robot 2 (Blue - Second Half): '{robot2_chars}' ({len(robot2_chars)} chars)"
-        
-        robot1_surface = status_font.render(robot1_info, True, RED)
-        robot2_surface = status_font.render(robot2_info, True, BLUE)
-        
-        self.screen.blit(robot1_surface, (50, HEIGHT - 80))
-        self.screen.blit(robot2_surface, (50, HEIGHT - 50))
+        title_surface = render_text("Final Result:", 'Arial', 32)
+        self.dirty.show("title", self.screen.blit(title_surface, (result_x, result_y - 40)), title_surface)
+        
+        # One line per robot, the last robot at the bottom
+        for i, chars in enumerate(self.robot_chars):
+            shown = chars if len(chars) <= 40 else chars[:37] + "..."
+            seconds = self.estimated_ticks[i] / FPS
+            utilization = self.utilization(i) * 100
+            robot_info = (f"Robot {i + 1}: '{shown}' ({len(chars)} chars, ~{seconds:.1f}s planned, "
+                          f"{utilization:.0f}% busy, idle {self.idle_ticks[i] / FPS:.1f}s)")
+            robot_surface = render_text(robot_info, 'Arial', 18, self._robot_color(i))
+            robot_rect = self.screen.blit(robot_surface, (50, HEIGHT - 50 - 30 * (self.num_robots - 1 - i)))
+            self.dirty.show(("info", i), robot_rect, robot_surface)
+        info_top = HEIGHT - 50 - 30 * self.num_robots
         
         # Show progress
-        total_points = len(self.robot1_path) + len(self.robot2_path)
-        completed_points = self.robot1_index + self.robot2_index
-        progress = f"Progress: {completed_points}/{total_points} points"
-        progress_surface = status_font.render(progress, True, BLACK)
-        self.screen.blit(progress_surface, (50, HEIGHT - 110))
+        total_points = self.page_points
+        completed_points = sum(self.indices)
+        progress = (f"Progress: {completed_points}/{total_points} points, "
+                    f"elapsed {self.total_ticks / FPS:.1f}s, {self.steals} steals")
+        progress_surface = render_text(progress, 'Arial', 18)
+        self.dirty.show("progress", self.screen.blit(progress_surface, (50, info_top)), progress_surface)
         
         # Show completion percentage
         if total_points > 0:
             percentage = (completed_points / total_points) * 100
-            percent_surface = status_font.render(f"Completion: {percentage:.1f}%", True, BLACK)
-            self.screen.blit(percent_surface, (50, HEIGHT - 140))
+            percent_surface = render_text(f"Completion: {percentage:.1f}%", 'Arial', 18)
+            self.dirty.show("percent", self.screen.blit(percent_surface, (50, info_top - 30)), percent_surface)
+        
+        # Show which sheet is being drawn
+        if len(self.pages) > 1:
+            page_surface = render_text(f"Page {self.page + 1}/{len(self.pages)}", 'Arial', 18)
+            self.dirty.show("page", self.screen.blit(page_surface, (WIDTH - 300, 50)), page_surface)
     
     def _create_cooperative_paths(self):
         if not self.user_text:
             return
         
-        # Calculate where to split the text (middle character)
-        text_length = len(self.user_text)
-        mid_point = text_length // 2
-        
-        robot1_text = self.user_text[:mid_point]
-        robot2_text = self.user_text[mid_point:]
-        
-        # Calculate the actual position where robot2 should start
-        # We need to figure out where robot1's text ends (considering line wraps)
-        robot2_start_x, robot2_start_y = self._calculate_robot2_start_position(robot1_text)
-        
-        # Build paths with proper positioning
-        robot1_start_x = PAPER_RECT.left + 20
-        robot1_start_y = PAPER_RECT.top + 20
-        
-        self.robot1_path = self.text_engine.build_path_coop_multiline(
-            robot1_text, 
-            robot1_start_x, 
-            robot1_start_y,
-            PAPER_RECT,
-            LINE_SPACING
-        )
-        
-        self.robot2_path = self.text_engine.build_path_coop_multiline(
-            robot2_text, 
-            robot2_start_x, 
-            robot2_start_y,
-            PAPER_RECT,
-            LINE_SPACING
-        )
+        # Lay out every page up front, then share each sheet between the robots
+        self.pages = self.text_engine.layout_pages(self.user_text, PAPER_RECT, LINE_SPACING)
+        self.page_makespans = None
+        self.page = 0
+        self._start_page()
+    
+    def _letter_times(self, letters):
+        """Ticks to draw each (char, x, y) letter, and to travel pen-up to it from the previous one"""
+        glyphs = [self.text_engine.get_glyph(char) for char, _, _ in letters]
+        durations = [float(glyph.ticks()) for glyph in glyphs]
+        gaps = [0.0]
+        for (prev, (_, px, py)), (glyph, (_, x, y)) in zip(zip(glyphs, letters), zip(glyphs[1:], letters[1:])):
+            distance = ((glyph.start[0] + x - prev.end[0] - px)**2 + (glyph.start[1] + y - prev.end[1] - py)**2)**0.5
+            gaps.append(float(travel_ticks(distance)))
+        return durations, gaps
+    
+    def _page_makespan(self, page):
+        """Planned ticks for a page, split the way _start_page will split it"""
+        durations, gaps = self._letter_times([glyph for word in page for glyph in word])
+        groups = split_by_time(durations, gaps, self.num_robots)
+        return max((group_time(durations, gaps, group) for group in groups), default=0)
+    
+    def _start_page(self):
+        """Split the letters of the current page between the robots by estimated drawing time"""
+        letters = [glyph for word in self.pages[self.page] for glyph in word]
+        letter_paths = [self.text_engine.glyphs_path([letter]) for letter in letters]
+        durations, gaps = self._letter_times(letters)
+        
+        groups = split_by_time(durations, gaps, self.num_robots)
+        self.paths = [PathBuffer(pen=True) for _ in range(self.num_robots)]
+        for ink in self.inks:
+            ink.clear()
+        self.queues = [deque() for _ in range(self.num_robots)]
+        self.robot_chars = [""] * self.num_robots
+        self.estimated_ticks = [0] * self.num_robots
+        for i, (first, end) in enumerate(groups):
+            for k in range(first, end):
+                self.queues[i].append((letters[k][0], letter_paths[k], durations[k] + gaps[k]))
+            self.estimated_ticks[i] = group_time(durations, gaps, (first, end))
+        self.page_points = sum(len(path) for path in letter_paths)
+        self.planned_ticks += max(self.estimated_ticks, default=0)
+        self.page_start_tick = self.total_ticks
+        print(f"Cooperative: page {self.page + 1} split over {len(groups)} robots, "
+              f"estimated makespan {max(self.estimated_ticks, default=0) / FPS:.1f}s")
         
         # Reset indices
-        self.robot1_index = 0
-        self.robot2_index = 0
-        
-        # Set initial robot positions
-        if self.robot1_path:
-            self.robot1.x, self.robot1.y, _ = self.robot1_path[0]
-        if self.robot2_path:
-            self.robot2.x, self.robot2.y, _ = self.robot2_path[0]
-    
-    def _calculate_robot2_start_position(self, robot1_text):
-        """Calculate where robot2 should start based on where robot1's text ends"""
-        margin_x = 20
-        margin_y = 20
-        
-        start_x = PAPER_RECT.left + margin_x
-        start_y = PAPER_RECT.top + margin_y
-        max_x = PAPER_RECT.right - margin_x
-        
-        current_x = start_x
-        current_y = start_y
-        
-        # Simulate drawing robot1's text to find end position
-        for char in robot1_text.upper():
-            if char == ' ':
-                current_x += self.text_engine.spacing * 2
-                # Check if space causes line wrap
-                if current_x > max_x:
-                    current_x = start_x
-                    current_y += LINE_SPACING
-                continue
-            
-            char_width = self.text_engine.get_char_width(char)
-            
-            # Check if character causes line wrap
-            if current_x + char_width > max_x:
-                current_x = start_x
-                current_y += LINE_SPACING
-            
-            # Draw the character (advance position)
-            current_x += char_width + self.text_engine.spacing
+        self.indices = [0] * self.num_robots
         
-        # Add a small space between robot1's last char and robot2's first char
-        current_x += self.text_engine.spacing
-        
-        # Check if robot2 needs to start on a new line
-        if current_x > max_x:
-            current_x = start_x
-            current_y += LINE_SPACING
-        
-        return current_x, current_y
+        # Claim the first letters and set initial robot positions
+        for i, robot in enumerate(self.robots):
+            if self.queues[i]:
+                self._claim_task(i)
+                robot.x, robot.y, _ = self.paths[i][0]
+    
+    def is_page_complete(self):
+        """Check if every robot finished the current page"""
+        return (not any(self.queues) and
+                all(index >= len(path) for index, path in zip(self.indices, self.paths)))
     
     def is_complete(self):
         """Check if drawing is complete"""
-        return (self.robot1_index >= len(self.robot1_path) and 
-                self.robot2_index >= len(self.robot2_path))
\ No newline at end of file
+        return self.page >= len(self.pages) - 1 and self.is_page_complete()
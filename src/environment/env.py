@@ -10,17 +10,101 @@ class Env:
     pass
 
 
+class DirtyRects:
+    """Screen regions that changed since the last display update.
+
+    Things redrawn every frame are shown under a key with whatever decides
+    their look (a text surface, a position...); only those that moved,
+    changed or disappeared are reported. One-off changes are added directly.
+    """
+    def __init__(self):
+        self.rects = []
+        self.shown = {}  # key -> (rect, content) on screen after the last update
+        self.frame = {}
+
+    def add(self, rect):
+        self.rects.append(pygame.Rect(rect))
+
+    def show(self, key, rect, content=None):
+        self.frame[key] = (pygame.Rect(rect), content)
+        return rect
+
+    def take(self):
+        """Changed regions since the last call; the old and new spot of everything that moved"""
+        for key in self.shown.keys() | self.frame.keys():
+            old, new = self.shown.get(key), self.frame.get(key)
+            if old != new:
+                if old is not None:
+                    self.rects.append(old[0])
+                if new is not None:
+                    self.rects.append(new[0])
+        self.shown, self.frame = self.frame, {}
+        rects, self.rects = self.rects, []
+        return rects
+
+
 class Border:
     def __init__(self):
         # Create a rectangle representing the paper
         self.rect = pygame.Rect(*PAPER_RECT)
+        self.dirty = DirtyRects()
         
     def draw(self, screen):
         # Draw the paper background
         pygame.draw.rect(screen, PAPER_COLOR, self.rect)
         # Draw the border lines (width of 3 pixels)
         pygame.draw.rect(screen, BORDER_COLOR, self.rect, 3)
+        self.dirty.show("paper", self.rect)
+
+    def dirty_rects(self):
+        # the paper never changes, it only needs showing once
+        return self.dirty.take()
 
     def is_inside(self, x, y):
         # Helper to check if a specific point is inside the paper
-        return self.rect.collidepoint(x, y)
\ No newline at end of file
+        return self.rect.collidepoint(x, y)
+
+
+class InkLayer:
+    """Off-screen surface that ink is committed to once and blitted every frame."""
+    def __init__(self, rect, background=None):
+        self.rect = pygame.Rect(rect)
+        self.background = background
+        if background is None:
+            self.surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        else:
+            self.surface = pygame.Surface(self.rect.size)
+        self.changed = []  # screen regions drawn on since the last changes() call
+        self.clear()
+
+    def clear(self):
+        # Start over with a blank sheet
+        self.surface.fill(self.background if self.background is not None else (0, 0, 0, 0))
+        self.changed = [self.rect.copy()]
+
+    def _local(self, point):
+        return (point[0] - self.rect.left, point[1] - self.rect.top)
+
+    def _changed(self, local_rect):
+        # many small changes (a fast-forward) are cheaper to show as one
+        if len(self.changed) >= INK_CHANGE_LIMIT:
+            self.changed = [self.rect.copy()]
+        elif self.changed != [self.rect]:
+            self.changed.append(local_rect.move(self.rect.topleft))
+
+    def line(self, color, start, end, width):
+        self._changed(pygame.draw.line(self.surface, color, self._local(start), self._local(end), width))
+
+    def circle(self, color, center, radius, width=0):
+        self._changed(pygame.draw.circle(self.surface, color, self._local(center), radius, width))
+
+    def polygon(self, color, points, width=0):
+        self._changed(pygame.draw.polygon(self.surface, color, [self._local(point) for point in points], width))
+
+    def changes(self):
+        """Screen regions that got ink since the last call"""
+        changed, self.changed = self.changed, []
+        return changed
+
+    def blit(self, screen):
+        screen.blit(self.surface, self.rect)
\ No newline at end of file
@@ -2,15 +2,21 @@ import pygame
 from src.settings import *
 from src.robot.robot import Robot
 from src.menu import Menu
-from src.utils.img_utils import image_to_rgb_array
+from src.utils.image_loader import ImageLoader
+from src.utils.fonts import render_text
+from src.utils.path_buffer import PathBuffer
+from src.planning.simplify import simplify_strokes, report
 from src.text.text_engine import TextEngine
+from src.text.text_robot import TextRobot
 from src.cooperative.cooperative_robot import CooperativeRobot
-from src.environment.env import Border
+from src.environment.env import Border, DirtyRects
 
 class Game:
     def __init__(self):
         pygame.init()
         self.last_img_arr = None
+        self.last_img_path = None
+        self.raster_resolution = IMAGE_RESOLUTION
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Autonomous Robotic Art Simulator")
         
@@ -21,6 +27,9 @@ class Game:
         
         self.robot = Robot()
         
+        # Dropped images are decoded off the event loop
+        self.image_loader = ImageLoader()
+        
         # Back button
         self.back_button = pygame.Rect(5, 5, 30, 30)
         
@@ -30,16 +39,18 @@ class Game:
         # Main game loop
         self.clock = pygame.time.Clock()
         self.running = True
+        
+        # Only changed regions are sent to the display, the whole window when the state changes
+        self.dirty = DirtyRects()
+        self.drawn_state = None
 
-        # Vector mode
+        # Vector mode: the user's strokes, the one being drawn is the buffer's open stroke
         self.draw_entered = False
-        self.vector_drawing = []
-        self.current_stroke = []
+        self.vector_drawing = PathBuffer()
 
         # Text mode variables
         self.text_engine = TextEngine(spacing=10, scale=1.5)
-        self.text_path = []
-        self.text_index = 0
+        self.text_robot = TextRobot(self.robot, self.text_engine)
         self.user_text = ""
         self.text_entered = False
         self.input_active = True
@@ -52,19 +63,26 @@ class Game:
         
     def run(self):
         while self.running:
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
                     self.running = False
-                elif event.type == pygame.DROPFILE and self.cur_state == "raster":
-                    img_path = event.file
-                    print("Dropped file:", img_path)
-                    self.last_img_arr = image_to_rgb_array(img_path, IMAGE_RESOLUTION)
-                    print("Array shape:", self.last_img_arr.shape)
-                elif event.type == pygame.DROPFILE and self.cur_state == "vector":
-                    img_path = event.file
-                    print("Dropped file:", img_path)
-                    self.last_img_arr = image_to_rgb_array(img_path, IMAGE_RESOLUTION)
-                    print("Array shape:", self.last_img_arr.shape)
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.drawn_state = None
+                elif event.type == pygame.DROPFILE and self.cur_state in ["raster", "vector"]:
+                    self.last_img_path = event.file
+                    print("Dropped file:", self.last_img_path)
+                    self.load_image()
+                elif event.type == IMAGE_READY and self.cur_state in ["raster", "vector"]:
+                    if event.error is not None:
+                        print(f"Could not load {event.path}: {event.error}")
+                    else:
+                        self.last_img_arr = event.array
+                        print("Array shape:", self.last_img_arr.shape)
+                        # a cached image comes back as the same array, start over explicitly
+                        if self.cur_state == "raster":
+                            self.robot.start_raster(self.last_img_arr, event.prepared)
+                        self.drawn_state = None
                 
                 # Handle menu events
                 if self.cur_state == "menu":
@@ -72,17 +90,16 @@ class Game:
                     if action:
                         print(f"*** ACTION FROM MENU: '{action}' ***")
                         self.cur_state = action
+                        self.image_loader.cancel()
                         self.last_img_arr = None
                         self.draw_entered = False
-                        self.vector_drawing = []
-                        self.current_stroke = []
+                        self.vector_drawing = PathBuffer()
                         if hasattr(self, 'vector_initialized'):
                             delattr(self, 'vector_initialized')
                         self.is_robot_initialized = False 
                         self.user_text = ""
                         self.text_entered = False
-                        self.text_path = []
-                        self.text_index = 0
+                        self.text_robot.reset()
                         print(f"Selected mode: {action}")
                 
                 # Handle text menu events
@@ -102,9 +119,16 @@ class Game:
                         elif self.cur_state == "text_menu":
                             self.cur_state = "menu"
                         else:
+                            # leaving raster or vector mode, an image still loading is not wanted anymore
+                            self.image_loader.cancel()
                             self.cur_state = "menu"
                         self._reset_text_mode()
                 
+                # Fast-forward / finish the running drawing
+                if event.type == pygame.KEYDOWN:
+                    self.handle_seek_keys(event)
+                    self.handle_resolution_keys(event)
+                
                 # Handle cooperative mode typing
                 if self.cur_state == "text_cooperative":
                     if self.cooperative_robot.handle_typing(event):
@@ -117,14 +141,8 @@ class Game:
                             self.text_entered = True
                             self.input_active = False
                             
-                            self.text_path = self.text_engine.build_path(
-                                self.user_text, 
-                                PAPER_RECT,
-                                LINE_SPACING
-                            )
-                            self.text_index = 0
-                            if self.text_path:
-                                self.robot.x, self.robot.y, _ = self.text_path[0]
+                            # The robot starts as soon as the first word is laid out
+                            self.text_robot.start(self.user_text)
                         elif event.key == pygame.K_BACKSPACE:
                             self.user_text = self.user_text[:-1]
                         else:
@@ -132,7 +150,7 @@ class Game:
             
             # Update game state
             if self.cur_state == "text_cooperative":
-                self.cooperative_robot.update()
+                self.cooperative_robot.advance()
             
             # Draw based on current state
             if self.cur_state == "menu":
@@ -148,9 +166,43 @@ class Game:
                 self.run_single_robot_mode()
             elif self.cur_state == "text_cooperative":
                 self.cooperative_robot.draw(self.draw_back_button)
+                if self.cooperative_robot.text_entered:
+                    # below the mode and page labels
+                    self.draw_eta(self.cooperative_robot.eta(), top=80)
             
-            pygame.display.flip()
-            self.clock.tick(60)
+            rects = self.dirty_rects()
+            if self.cur_state != self.drawn_state or not DIRTY_RECTS:
+                self.drawn_state = self.cur_state
+                pygame.display.flip()
+            elif rects:
+                if len(rects) > DIRTY_RECT_LIMIT:
+                    rects = [rects[0].unionall(rects[1:])]
+                pygame.display.update(rects)
+            
+            # Nothing moved, nothing is being drawn and no input came in, no need to spin at full rate
+            self.clock.tick(FPS if rects or events or self.is_drawing() else IDLE_FPS)
+        
+        self.image_loader.shutdown()
+    
+    def is_drawing(self):
+        """Whether a robot is still working, so every tick has to run"""
+        if self.cur_state == "raster":
+            return self.image_loader.is_busy() or (
+                self.last_img_arr is not None and not self.robot.is_raster_complete(self.last_img_arr))
+        if self.cur_state == "vector":
+            return self.draw_entered and not self.robot.is_vector_complete()
+        if self.cur_state == "text_single":
+            return self.text_entered and not self.text_robot.is_complete()
+        if self.cur_state == "text_cooperative":
+            return self.cooperative_robot.text_entered and not self.cooperative_robot.is_complete()
+        return False
+
+    def dirty_rects(self):
+        """Regions of the window changed by this frame's drawing"""
+        rects = self.dirty.take()
+        for part in (self.menu, self.text_menu, self.border, self.robot, self.text_robot, self.cooperative_robot):
+            rects.extend(part.dirty_rects())
+        return rects
             
     def wrap_text(self, text, font, max_width):
         """Splits a string into a list of lines that fit within max_width."""
@@ -182,71 +234,134 @@ class Game:
         """Reset all text mode variables"""
         self.user_text = ""
         self.text_entered = False
-        self.text_path = []
-        self.text_index = 0
+        self.text_robot.reset()
         self.cooperative_robot.reset()
 
+    def load_image(self):
+        """Load the last dropped image at the current raster resolution"""
+        keep_aspect = RASTER_KEEP_ASPECT and self.cur_state == "raster"
+        # planning a raster takes seconds on big grids, keep it on the loader's thread with the spinner up
+        prepare = self.robot.plan_raster if self.cur_state == "raster" else None
+        self.image_loader.load(self.last_img_path, self.raster_resolution, keep_aspect, prepare)
+
+    def handle_resolution_keys(self, event):
+        """Number keys pick the raster grid size, reloading the current image"""
+        if self.cur_state != "raster" or not event.unicode.isdigit():
+            return
+        choice = int(event.unicode) - 1
+        if 0 <= choice < len(RASTER_RESOLUTIONS) and RASTER_RESOLUTIONS[choice] != self.raster_resolution:
+            self.raster_resolution = RASTER_RESOLUTIONS[choice]
+            print(f"Raster resolution: {self.raster_resolution}")
+            if self.last_img_path is not None:
+                self.load_image()
+
+    def handle_seek_keys(self, event):
+        """RIGHT skips ahead, END jumps to the finished drawing"""
+        if event.key not in (pygame.K_RIGHT, pygame.K_END):
+            return
+        finish = event.key == pygame.K_END
+        if self.cur_state == "raster" and self.last_img_arr is not None:
+            tick = self.robot.raster_total_ticks(self.last_img_arr) if finish else self.robot.raster_tick + SEEK_STEP
+            self.robot.seek_raster(self.last_img_arr, tick)
+        elif self.cur_state == "vector" and self.draw_entered:
+            tick = self.robot.vector_motion.total_ticks if finish else self.robot.vector_tick + SEEK_STEP
+            self.robot.seek_vector(tick)
+        elif self.cur_state == "text_single" and self.text_entered:
+            if finish:
+                self.text_robot.finish()
+            else:
+                self.text_robot.fast_forward(SEEK_STEP)
+        elif self.cur_state == "text_cooperative" and self.cooperative_robot.text_entered:
+            if finish:
+                self.cooperative_robot.finish()
+            else:
+                self.cooperative_robot.fast_forward(SEEK_STEP)
+
+    def draw_eta(self, seconds, top=10):
+        """Show the time left for the running drawing"""
+        eta_surface = render_text(f"ETA {seconds:.1f}s  (RIGHT: skip, END: finish)", 'Arial', 20)
+        eta_rect = self.screen.blit(eta_surface, (WIDTH - eta_surface.get_width() - 10, top))
+        self.dirty.show("eta", eta_rect, eta_surface)
+
     def draw_back_button(self):
         pygame.draw.circle(self.screen, GRAY, self.back_button.center, self.back_button.width // 2)
         pygame.draw.circle(self.screen, BLACK, self.back_button.center, self.back_button.width // 2, 2)
-        font = pygame.font.SysFont('Serif', 28, bold=True)
-        text = font.render("←", True, BLACK)  
+        text = render_text("←", 'Serif', 28, bold=True)
         text_rect = text.get_rect(center=self.back_button.center)
         self.screen.blit(text, text_rect)
+        self.dirty.show("back", self.back_button)
+
+    def draw_loading(self):
+        """Spinner shown while a dropped image is decoded in the background"""
+        center = (WIDTH // 2, PAPER_RECT.top // 2 + 5)
+        start = pygame.time.get_ticks() / 150
+        spinner_rect = pygame.draw.arc(self.screen, PURPLE, (center[0] - 130, center[1] - 12, 24, 24), start, start + 4.5, 3)
+        text = render_text("Loading image...", 'Serif', 24)
+        text_rect = self.screen.blit(text, text.get_rect(midleft=(center[0] - 95, center[1])))
+        self.dirty.show("loading", spinner_rect.union(text_rect).inflate(4, 4), start)
 
     def run_raster_mode(self):
-        self.screen.fill(WHITE)
+        self.dirty.show("background", self.screen.fill(WHITE))
         self.draw_back_button()
-        self.robot.draw_raster(self.screen, self.last_img_arr)
+        if self.image_loader.is_busy():
+            self.draw_loading()
+            if self.last_img_arr is None:
+                return
+        ticks = self.robot.raster_ticks_per_frame(self.last_img_arr) if self.last_img_arr is not None else 1
+        self.robot.draw_raster(self.screen, self.last_img_arr, ticks)
+        if self.last_img_arr is not None:
+            self.draw_eta(self.robot.raster_eta(self.last_img_arr, ticks))
+        
+        # grid size picker
+        choices = "  ".join(f"{i + 1}: {n}" for i, n in enumerate(RASTER_RESOLUTIONS))
+        grid_surface = render_text(f"Grid {self.raster_resolution}   ({choices})", 'Arial', 20)
+        self.dirty.show("grid", self.screen.blit(grid_surface, (45, 10)), grid_surface)
 
     def run_vector_mode(self):
-        self.screen.fill(WHITE)
+        self.dirty.show("background", self.screen.fill(WHITE))
         self.border.draw(self.screen)
         self.draw_back_button()
-        font = pygame.font.SysFont('Serif', 28)
-        
         if not self.draw_entered:
-            prompt_surface = font.render("Draw inside the frame, then press ENTER to see robot redraw it", True, BLACK)
-            self.screen.blit(prompt_surface, (WIDTH // 2 - 400, 10))
+            prompt_surface = render_text("Draw inside the frame, then press ENTER to see robot redraw it", 'Serif', 28)
+            self.dirty.show("prompt", self.screen.blit(prompt_surface, (WIDTH // 2 - 400, 10)), prompt_surface)
             
             mouse_pressed = pygame.mouse.get_pressed()[0]
             if mouse_pressed:
                 mouse_pos = pygame.mouse.get_pos()
                 # check if mouse is inside the drawing frame
                 if PAPER_RECT.collidepoint(mouse_pos):
-                    if not hasattr(self, 'vector_drawing'):
-                        self.vector_drawing = []
-                        self.current_stroke = []
-                    
-                    self.current_stroke.append(mouse_pos)
+                    self.vector_drawing.append(*mouse_pos)
             else:
-                if hasattr(self, 'current_stroke') and len(self.current_stroke) > 0:
-                    self.vector_drawing.append(self.current_stroke[:])
-                    self.current_stroke = []
+                self.vector_drawing.end_stroke()
             
             # draw
-            if hasattr(self, 'vector_drawing'):
-                for stroke in self.vector_drawing:
-                    if len(stroke) > 1:
-                        pygame.draw.lines(self.screen, BLACK, False, stroke, 3)
-                # draw stroke as user enters it
-                if hasattr(self, 'current_stroke') and len(self.current_stroke) > 1:
-                    pygame.draw.lines(self.screen, BLACK, False, self.current_stroke, 3)
+            for stroke in self.vector_drawing.strokes():
+                if len(stroke) > 1:
+                    pygame.draw.lines(self.screen, BLACK, False, stroke, 3)
+            # draw stroke as user enters it
+            if len(self.vector_drawing.open_stroke) > 1:
+                pygame.draw.lines(self.screen, BLACK, False, self.vector_drawing.open_stroke, 3)
+            self.dirty.show("sketch", PAPER_RECT.inflate(6, 6), len(self.vector_drawing))
             
             # check for ENTER key 
             keys = pygame.key.get_pressed()
-            if keys[pygame.K_RETURN] and hasattr(self, 'vector_drawing') and len(self.vector_drawing) > 0:
+            if keys[pygame.K_RETURN] and self.vector_drawing.stroke_count > 0:
                 self.draw_entered = True
                 # init robot for vector drawing
                 if not hasattr(self, 'vector_initialized'):
-                    self.robot.init_vector_drawing(self.vector_drawing)
+                    # mouse samples come in at every frame, most of them are not needed for the shape
+                    captured = self.vector_drawing.strokes()
+                    strokes, before, after = simplify_strokes(captured, VECTOR_SIMPLIFY_TOLERANCE)
+                    print(f"Vector input: {report(captured, strokes, before, after)}")
+                    self.robot.init_vector_drawing(strokes)
                     self.vector_initialized = True
         else:
             self.robot.draw_vector(self.screen)
+            self.draw_eta(self.robot.vector_eta())
 
     def run_single_robot_mode(self):
         """Single robot mode"""
-        self.screen.fill(WHITE)
+        self.dirty.show("background", self.screen.fill(WHITE))
         # Draw the border of the paper
         self.border.draw(self.screen)
         self.draw_back_button()
@@ -258,33 +373,17 @@ class Game:
             
         if not self.text_entered:
             # Show typing prompt
-            font = pygame.font.SysFont('Arial', 32)
             full_line = "Enter text and press Enter: " + self.user_text + "|"
-            prompt_surface = font.render(full_line, True, BLACK)
-            self.screen.blit(prompt_surface,(PAPER_RECT.left, PAPER_RECT.top - 40))
+            prompt_surface = render_text(full_line, 'Arial', 32)
+            prompt_rect = self.screen.blit(prompt_surface,(PAPER_RECT.left, PAPER_RECT.top - 40))
+            self.dirty.show("prompt", prompt_rect, prompt_surface)
             #input_surface = font.render(self.user_text+ "|", True, BLUE)
             #self.screen.blit(input_surface,(PAPER_RECT.left + 20, PAPER_RECT.top + 20))
             self.robot.draw_robot(self.screen)
         else:
-            if len(self.text_path) > 1:
-                for i in range(1, self.text_index):
-                    p1 = self.text_path[i-1]
-                    p2 = self.text_path[i]
-                    if p2[2] == 1: # If pen is DOWN
-                        pygame.draw.line(self.screen, BLACK, (p1[0], p1[1]), (p2[0], p2[1]), 2)
-
-            # Move Robot
-            if self.text_index < len(self.text_path):
-                target_x, target_y, pen = self.text_path[self.text_index]
-                
-                # Move robot towards target
-                self.robot.move_to(target_x, target_y)
-                
-                # If robot arrived at point, go to next point
-                if abs(self.robot.x - target_x) < 2 and abs(self.robot.y - target_y) < 2:
-                    self.text_index += 1
-
-            self.robot.draw_robot(self.screen)
+            self.text_robot.update()
+            self.text_robot.draw(self.screen)
+            self.draw_eta(self.text_robot.eta())
             
     def reset_robot_to_start(self):
             start_x = PAPER_RECT.left + 20
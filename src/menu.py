@@ -1,11 +1,11 @@
 import pygame
 from src.settings import *
+from src.utils.fonts import render_text
+from src.environment.env import DirtyRects
 
 class Menu:
     def __init__(self, screen, Buttons):
         self.screen = screen
-        self.font = pygame.font.SysFont('Serif', 32)
-        self.title_font = pygame.font.SysFont('Serif', 44, bold=True)
         self.buttons = [
         {
             "text": button["text"],
@@ -15,6 +15,7 @@ class Menu:
         for button in Buttons
     ]
         self.setup_buttons()
+        self.dirty = DirtyRects()
 
     def setup_buttons(self):
         total_height = len(self.buttons) * BUTTON_HEIGHT  
@@ -25,16 +26,16 @@ class Menu:
             button["rect"].y = start_y + i * 70
     
     def draw(self, Title, Subtitle):
-        self.screen.fill(WHITE)
+        self.dirty.show("background", self.screen.fill(WHITE))
         
         # Draw title
-        title = self.title_font.render(Title, True, BLACK)
+        title = render_text(Title, 'Serif', 44, bold=True)
         title_rect = title.get_rect(center=(WIDTH//2, 100))
-        self.screen.blit(title, title_rect)
+        self.dirty.show("title", self.screen.blit(title, title_rect), title)
         
-        subtitle = self.font.render(Subtitle, True, BLACK) 
+        subtitle = render_text(Subtitle, 'Serif', 32)
         subtitle_rect = subtitle.get_rect(center=(WIDTH//2, 160))
-        self.screen.blit(subtitle, subtitle_rect)
+        self.dirty.show("subtitle", self.screen.blit(subtitle, subtitle_rect), subtitle)
         
         # Draw buttons
         for button in self.buttons:
@@ -43,9 +44,14 @@ class Menu:
             pygame.draw.rect(self.screen, BLACK, button["rect"], 2, border_radius=10)
             
             # Button text
-            text = self.font.render(button["text"], True, WHITE)
+            text = render_text(button["text"], 'Serif', 32, WHITE)
             text_rect = text.get_rect(center=button["rect"].center)
             self.screen.blit(text, text_rect)
+            self.dirty.show(button["action"], button["rect"], text)
+    
+    def dirty_rects(self):
+        # the menu is static, it only changes when it is first shown
+        return self.dirty.take()
     
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
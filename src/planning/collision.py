@@ -0,0 +1,116 @@
+import math
+from src.settings import ROBOT_SEPARATION, ROBOT_PATIENCE
+
+# Heading offsets (degrees) tried, in order, when the direct step is blocked
+DETOUR_ANGLES = (30, -30, 60, -60, 90, -90)
+
+
+class SeparationPlanner:
+    """Keeps robots that share the paper at least min_separation apart.
+
+    Every tick the robots are planned one after another in priority order.
+    Each planned robot reserves the position it moves to. A robot may only
+    step to a spot that is clear of those reservations and of the current
+    positions of robots not planned yet, so standing still is always safe.
+    A blocked robot with its pen up tries a few detour headings; with its
+    pen down it waits, since a detour would draw in the wrong place. A robot
+    that has waited longer than `patience` ticks goes first and, if still
+    blocked, is let through so that two robots can never deadlock.
+
+    A forced move gives up the guarantee: the robot steps anyway and can end
+    up closer than min_separation to the one blocking it (nobody backs off).
+    Ticks that end with any two robots too close are counted in
+    violation_ticks and the smallest distance seen in closest_approach.
+    """
+    def __init__(self, num_robots, min_separation=ROBOT_SEPARATION, patience=ROBOT_PATIENCE):
+        self.min_separation = min_separation
+        self.patience = patience
+        self.waiting = [0] * num_robots      # consecutive ticks spent blocked
+        self.wait_ticks = [0] * num_robots   # total ticks spent waiting
+        self.detour_ticks = [0] * num_robots # total ticks spent off the direct path
+        self.forced_moves = 0
+        self.violation_ticks = 0             # ticks ending with two robots closer than min_separation
+        self.closest_approach = math.inf
+
+    def _cell(self, x, y):
+        return (int(x // self.min_separation), int(y // self.min_separation))
+
+    def _is_clear(self, occupied, x, y, robot):
+        """No other robot within min_separation of (x, y), unless the step moves away from it."""
+        cx, cy = self._cell(x, y)
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for ox, oy in occupied.get((gx, gy), {}).values():
+                    dist = math.hypot(x - ox, y - oy)
+                    # robots that already overlap may still separate
+                    if dist < self.min_separation and dist < math.hypot(robot.x - ox, robot.y - oy):
+                        return False
+        return True
+
+    def plan(self, robots, targets, pens, priorities):
+        """Positions the robots may move to this tick.
+
+        targets[i] is robot i's (x, y) goal or None when it has nothing to do,
+        pens[i] whether it is drawing, priorities[i] its remaining work (more
+        work goes first).
+        """
+        positions = [(robot.x, robot.y) for robot in robots]
+
+        # Spatial hash of where every robot is, or will be once it has been planned
+        occupied = {}
+        cells = [None] * len(robots)
+
+        def place(i, x, y):
+            cells[i] = self._cell(x, y)
+            occupied.setdefault(cells[i], {})[i] = (x, y)
+
+        for i, (x, y) in enumerate(positions):
+            place(i, x, y)
+
+        # Robots without a target simply stay where they are
+        order = sorted((i for i, target in enumerate(targets) if target is not None),
+                       key=lambda i: (self.waiting[i] < self.patience, -priorities[i]))
+
+        for i in order:
+            robot = robots[i]
+            del occupied[cells[i]][i]
+
+            step = robot.next_position(*targets[i])
+            if not self._is_clear(occupied, *step, robot) and not pens[i]:
+                detour = self._detour(robot, targets[i], occupied)
+                if detour is not None:
+                    step = detour
+                    self.detour_ticks[i] += 1
+
+            if self._is_clear(occupied, *step, robot):
+                self.waiting[i] = 0
+            elif self.waiting[i] >= self.patience:
+                self.forced_moves += 1
+            else:
+                step = positions[i]
+                self.waiting[i] += 1
+                self.wait_ticks[i] += 1
+
+            positions[i] = step
+            place(i, *step)
+
+        self._check_separation(positions)
+        return positions
+
+    def _check_separation(self, positions):
+        closest = min((math.hypot(x1 - x2, y1 - y2) for k, (x1, y1) in enumerate(positions)
+                       for x2, y2 in positions[k + 1:]), default=math.inf)
+        self.closest_approach = min(self.closest_approach, closest)
+        if closest < self.min_separation:
+            self.violation_ticks += 1
+
+    def _detour(self, robot, target, occupied):
+        """First clear step at full speed along a heading rotated away from the target."""
+        heading = math.atan2(target[1] - robot.y, target[0] - robot.x)
+        for offset in DETOUR_ANGLES:
+            angle = heading + math.radians(offset)
+            x = robot.x + math.cos(angle) * robot.speed
+            y = robot.y + math.sin(angle) * robot.speed
+            if self._is_clear(occupied, x, y, robot):
+                return x, y
+        return None
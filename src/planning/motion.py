@@ -0,0 +1,85 @@
+import math
+import numpy as np
+from src.settings import ROBOT_SPEED, FPS
+
+
+def arrival_ticks(starts, ends, speed=ROBOT_SPEED, tolerance=0):
+    """Ticks Robot.move_to takes from each start to each end point.
+
+    The robot moves `speed` per tick and snaps onto the target once it is
+    closer than one step. With a tolerance, arrival is also counted as soon
+    as both coordinates are within `tolerance`, which is what the modes check.
+    Every point costs at least one tick, even when the robot is already there.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    delta = ends - starts
+    distance = np.hypot(delta[:, 0], delta[:, 1])
+    ticks = np.floor(distance / speed) + 1
+    if tolerance > 0:
+        # distance left along the segment once both |dx| and |dy| are below the tolerance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            axis = np.abs(delta).max(axis=1) / distance
+            early = np.floor((distance - tolerance / axis) / speed) + 1
+        ticks = np.where(distance > 0, np.minimum(ticks, np.maximum(early, 1)), 1)
+    return ticks.astype(np.int64)
+
+
+class MotionTimeline:
+    """Closed-form schedule of a robot following a list of points.
+
+    arrivals[i] is the tick at which point i is reached, so any moment of the
+    job can be looked up with a binary search instead of stepping the robot.
+    """
+    def __init__(self, points, start=None, speed=ROBOT_SPEED, tolerance=0):
+        points = np.asarray(points)
+        if points.dtype.names:
+            xy = np.column_stack((points['x'], points['y'])).astype(float)
+        else:
+            xy = points.astype(float).reshape(len(points), -1)[:, :2] if len(points) else np.empty((0, 2))
+        self.points = xy
+        self.speed = speed
+        if start is None:
+            start = xy[0] if len(xy) else (0.0, 0.0)
+        self.start = np.asarray(start, dtype=float)
+
+        previous = np.vstack((self.start[None, :], xy[:-1])) if len(xy) else xy
+        self.ticks = arrival_ticks(previous, xy, speed, tolerance)
+        self.arrivals = np.cumsum(self.ticks)
+
+    def __len__(self):
+        return len(self.points)
+
+    @property
+    def total_ticks(self):
+        return int(self.arrivals[-1]) if len(self.arrivals) else 0
+
+    @property
+    def total_seconds(self):
+        return self.total_ticks / FPS
+
+    def index_at(self, tick):
+        """Number of points reached after `tick` ticks"""
+        return int(np.searchsorted(self.arrivals, tick, side='right'))
+
+    def position_at(self, tick):
+        """Where the robot is after `tick` ticks"""
+        i = self.index_at(tick)
+        if i >= len(self.points):
+            return tuple(self.points[-1]) if len(self.points) else tuple(self.start)
+        previous = self.points[i - 1] if i > 0 else self.start
+        elapsed = tick - (self.arrivals[i - 1] if i > 0 else 0)
+        delta = self.points[i] - previous
+        distance = math.hypot(delta[0], delta[1])
+        if distance == 0:
+            return tuple(previous)
+        travelled = min(elapsed * self.speed, distance)
+        return tuple(previous + delta * (travelled / distance))
+
+    def tick_of(self, index):
+        """Tick at which point `index` is reached"""
+        return int(self.arrivals[index])
+
+    def eta(self, tick):
+        """Seconds left after `tick` ticks"""
+        return max(self.total_ticks - tick, 0) / FPS
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def quantize(img_arr, k, iterations=10, seed=0):
+    """Reduce an image to at most k colors with k-means.
+
+    Returns the palette as a (k, 3) uint8 array and the palette index of
+    every pixel. Images with k colors or fewer keep their exact colors.
+    """
+    pixels = np.asarray(img_arr)[..., :3].reshape(-1, 3)
+    colors, inverse, counts = np.unique(pixels, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    if len(colors) <= k:
+        return colors.astype(np.uint8), inverse.reshape(img_arr.shape[:2])
+
+    # cluster the distinct colors, weighted by how often they occur
+    points = colors.astype(np.float64)
+    weights = counts.astype(np.float64)
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    nearest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        chance = weights * nearest
+        centers.append(points[rng.choice(len(points), p=chance / chance.sum())])
+        nearest = np.minimum(nearest, ((points - centers[-1]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        totals = np.zeros_like(centers)
+        np.add.at(totals, labels, points * weights[:, None])
+        mass = np.bincount(labels, weights=weights, minlength=k)
+        moved = mass > 0  # an empty cluster keeps its old center
+        updated = centers.copy()
+        updated[moved] = totals[moved] / mass[moved, None]
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    labels = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    palette = np.clip(np.round(centers), 0, 255).astype(np.uint8)
+    return palette, labels[inverse].reshape(img_arr.shape[:2])
+
+
+def pen_swaps(colors):
+    """Color changes along a sequence of (r, g, b) colors"""
+    colors = np.asarray(colors)
+    if len(colors) < 2:
+        return 0
+    return int(np.any(colors[1:] != colors[:-1], axis=1).sum())
+
+
+def travel_distance(points):
+    """Length of the path through a sequence of (x, y) points"""
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return 0.0
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
@@ -0,0 +1,241 @@
+import numpy as np
+import pygame
+from src.settings import PAPER_RECT, PIXEL_SIZE, FPS
+from src.planning.palette import quantize, pen_swaps, travel_distance
+from src.planning.stroke_planner import order_strokes, improve_order
+
+
+class RasterLayout:
+    """Grid of rows x cols pixel circles, as large as fits inside `fit_rect`.
+
+    The pitch (distance between pixel centers) is capped at `max_pitch`, so
+    small images keep their usual size, and the grid is centered in the rect.
+    """
+    def __init__(self, rows, cols, fit_rect=PAPER_RECT, max_pitch=2 * PIXEL_SIZE):
+        fit_rect = pygame.Rect(fit_rect)
+        self.rows = rows
+        self.cols = cols
+        self.pitch = min(fit_rect.width / cols, fit_rect.height / rows, max_pitch)
+        self.radius = self.pitch / 2
+        # circles too small for an outline are filled instead
+        self.line_width = 3 if self.radius >= 6 else 0
+        self.origin_x = fit_rect.centerx - (cols - 1) * self.pitch / 2
+        self.origin_y = fit_rect.centery - (rows - 1) * self.pitch / 2
+
+    def center(self, row, col):
+        return self.origin_x + col * self.pitch, self.origin_y + row * self.pitch
+
+    def bounds(self):
+        # area covered by the whole grid, including the circle outlines
+        pad = self.radius + 3
+        left, top = self.center(0, 0)
+        right, bottom = self.center(self.rows - 1, self.cols - 1)
+        return pygame.Rect(int(left - pad), int(top - pad),
+                           int(right - left + 2 * pad) + 1, int(bottom - top + 2 * pad) + 1)
+
+
+class RasterPlan:
+    """Everything the raster robot needs, computed in one pass over the image.
+
+    The plan is a list of strokes in visiting order: a single pixel drawn as
+    a circle, or a horizontal run of same-colored pixels drawn as one
+    stadium outline around them. centers[n] is the first pixel of stroke n,
+    lengths[n] its number of pixels and colors[n] its color. The robot walks
+    each outline in steps as long as a `step`-degree arc of a single circle,
+    starting at the top of the first pixel.
+
+    Near-background pixels (within `blank_tolerance` of `background`) are
+    skipped. Without pens the strokes are visited in serpentine rows in
+    their own colors; with `pens` the image is reduced to that many colors
+    and each pen draws all of its strokes before the next one is picked up.
+    """
+    def __init__(self, img_arr, layout, step, pens=0, time_budget=0.0,
+                 background=(255, 255, 255), blank_tolerance=-1, merge_runs=False):
+        rows, cols = img_arr.shape[:2]
+        self.rows = rows
+        self.cols = cols
+        self.layout = layout
+        self.radius = radius = layout.radius
+        self.step = step
+
+        # robot offsets around a single circle, one per step
+        angles = np.radians(np.arange(0, 360, step) - 90)
+        self.offsets = radius * np.column_stack((np.cos(angles), np.sin(angles)))
+
+        # polyline of the arc drawn after k steps of a single circle
+        self.arcs = [None]
+        for k in range(1, len(self.offsets)):
+            arc_angle = k * step
+            num_points = max(2, int(arc_angle / 5))
+            arc = np.radians(-90 + arc_angle * np.arange(num_points + 1) / num_points)
+            self.arcs.append(radius * np.column_stack((np.cos(arc), np.sin(arc))))
+
+        original = np.asarray(img_arr)[:, :, :3].astype(np.uint8)
+        if pens:
+            palette, labels = quantize(original, pens)
+        else:
+            palette, labels = np.unique(original.reshape(-1, 3), axis=0, return_inverse=True)
+            labels = labels.reshape(rows, cols)
+
+        # pixels that would be drawn in (or close to) the paper color are left out
+        background = np.asarray(background, dtype=float)
+        blank = np.zeros((rows, cols), dtype=bool)
+        if blank_tolerance >= 0:
+            blank_pen = np.linalg.norm(palette - background, axis=1) <= blank_tolerance
+            blank = (np.linalg.norm(original - background, axis=2) <= blank_tolerance) | blank_pen[labels]
+        keys = np.where(blank, -1, labels)
+
+        # strokes: horizontal runs of one pen, or single pixels
+        first = np.ones((rows, cols), dtype=bool)
+        if merge_runs:
+            first[:, 1:] = keys[:, 1:] != keys[:, :-1]
+        row, col = np.nonzero(first)
+        # a run lasts until the next one starts; column 0 always starts one, so runs stay in their row
+        run_end = np.append(np.flatnonzero(first.reshape(-1))[1:], rows * cols)
+        length = run_end - (row * cols + col)
+        pen = keys[row, col]
+        drawn = pen >= 0
+        row, col, length, pen = row[drawn], col[drawn], length[drawn], pen[drawn]
+
+        # serpentine visit order: even rows left to right, odd rows right to left
+        serpentine = np.lexsort((np.where(row % 2 == 0, col, -col), row))
+        row, col, length, pen = row[serpentine], col[serpentine], length[serpentine], pen[serpentine]
+        self.centers = np.column_stack(layout.center(row, col))
+        self.lengths = length
+        self.colors = palette[pen].astype(np.uint8)
+
+        if pens:
+            order = self._pen_order(palette, pen, time_budget)
+            self.centers = self.centers[order]
+            self.lengths = self.lengths[order]
+            self.colors = self.colors[order]
+        self.pens = len(np.unique(self.colors, axis=0))
+        self.pen_swaps = pen_swaps(self.colors)
+        self.travel = travel_distance(self.centers)
+
+        # ticks per stroke: its steps plus one to commit it
+        self.circle_steps = len(self.offsets)
+        self.step_length = 2 * np.pi * radius / self.circle_steps
+        perimeters = 2 * np.pi * radius + 2 * (self.lengths - 1) * layout.pitch
+        self.stroke_steps = np.where(self.lengths == 1, self.circle_steps,
+                                     np.ceil(perimeters / self.step_length - 1e-9)).astype(np.int64)
+        self.finish_ticks = np.cumsum(self.stroke_steps + 1)
+
+        # today's plan: every pixel as a circle in its own color, in serpentine order
+        serp_row = np.repeat(np.arange(rows), cols)
+        serp_col = np.tile(np.arange(cols), rows)
+        serp_col = np.where(serp_row % 2 == 0, serp_col, cols - 1 - serp_col)
+        self.baseline_pen_swaps = pen_swaps(original[serp_row, serp_col])
+        self.baseline_travel = travel_distance(np.column_stack(layout.center(serp_row, serp_col)))
+        self.baseline_ticks = rows * cols * (self.circle_steps + 1)
+        self.skipped = int(blank.sum())
+        self.merged = int((self.lengths > 1).sum())
+
+    def _pen_order(self, palette, labels, time_budget):
+        # light pens first, as on paper; every pen continues from where the last one stopped
+        luminance = palette.astype(float) @ (0.299, 0.587, 0.114)
+        used = [pen for pen in np.argsort(-luminance, kind="stable") if np.any(labels == pen)]
+        order = []
+        current = self.centers[0] if len(self.centers) else None
+        for pen in used:
+            strokes = np.flatnonzero(labels == pen)
+            # the serpentine subset is hard to beat on solid areas, greedy on scattered ones
+            candidates = [strokes, self._nearest_order(strokes, current)]
+            if time_budget > 0:
+                candidates.append(self._improved_order(candidates[1], time_budget / len(used)))
+            lengths = [travel_distance(np.vstack((current, self.centers[c]))) for c in candidates]
+            best = candidates[int(np.argmin(lengths))]
+            order.extend(best.tolist())
+            current = self.centers[best[-1]]
+        return np.array(order, dtype=int)
+
+    def _strokes(self, indices):
+        # strokes as one-point strokes for the stroke planner, and the way back to their numbers
+        points = [tuple(p) for p in self.centers[indices].tolist()]
+        return [[point] for point in points], dict(zip(points, indices.tolist()))
+
+    def _nearest_order(self, indices, start):
+        # greedy nearest neighbour tour from the pen's current position
+        strokes, index = self._strokes(indices)
+        ordered, _ = order_strokes([[tuple(start)]] + strokes)
+        return np.array([index[stroke[0]] for stroke in ordered[1:]], dtype=int)
+
+    def _improved_order(self, indices, time_budget):
+        # 2-opt / Or-opt on top of the greedy tour
+        strokes, index = self._strokes(indices)
+        improved, _, _ = improve_order(strokes, time_budget=time_budget)
+        return np.array([index[stroke[0]] for stroke in improved], dtype=int)
+
+    @property
+    def total_ticks(self):
+        return int(self.finish_ticks[-1]) if len(self.finish_ticks) else 0
+
+    def report(self):
+        saved = 1 - self.total_ticks / self.baseline_ticks if self.baseline_ticks else 0.0
+        return (f"{len(self)} strokes for {self.rows * self.cols} pixels ({self.skipped} blank skipped, "
+                f"{self.merged} runs merged), {self.pens} pens, "
+                f"pen swaps {self.baseline_pen_swaps} -> {self.pen_swaps}, "
+                f"travel {self.baseline_travel:.0f}px -> {self.travel:.0f}px, "
+                f"drawing time {self.baseline_ticks / FPS:.0f}s -> {self.total_ticks / FPS:.0f}s ({saved:.0%} saved)")
+
+    def __len__(self):
+        return len(self.centers)
+
+    def steps(self, n):
+        return int(self.stroke_steps[n])
+
+    def center(self, n):
+        return tuple(self.centers[n].tolist())
+
+    def color(self, n):
+        return tuple(self.colors[n].tolist())
+
+    def _outline(self, n, distance):
+        # points at `distance` along stroke n's outline: along the top, around the
+        # right end, back along the bottom and around the left end
+        r = self.radius
+        straight = (self.lengths[n] - 1) * self.layout.pitch
+        distance = np.asarray(distance, dtype=float)
+        top = distance < straight
+        right = (distance >= straight) & (distance < straight + np.pi * r)
+        bottom = (distance >= straight + np.pi * r) & (distance < 2 * straight + np.pi * r)
+        left = distance >= 2 * straight + np.pi * r
+
+        angle = np.where(right, (distance - straight) / r - np.pi / 2,
+                         (distance - 2 * straight - np.pi * r) / r + np.pi / 2)
+        x = np.select([top, right, bottom, left],
+                      [distance, straight + r * np.cos(angle),
+                       straight - (distance - straight - np.pi * r), r * np.cos(angle)])
+        y = np.select([top, right, bottom, left], [np.full_like(distance, -r), r * np.sin(angle),
+                                                   np.full_like(distance, r), r * np.sin(angle)])
+        return self.centers[n] + np.column_stack((x, y))
+
+    def position(self, n, k):
+        """Pen position on stroke n after k steps"""
+        if self.lengths[n] == 1:
+            return tuple((self.centers[n] + self.offsets[k]).tolist())
+        return tuple(self._outline(n, k * self._perimeter(n) / self.stroke_steps[n])[0].tolist())
+
+    def _perimeter(self, n):
+        return 2 * np.pi * self.radius + 2 * (self.lengths[n] - 1) * self.layout.pitch
+
+    def _outline_points(self, n, end):
+        # dense polyline along the outline up to `end`, keeping the corners of the straight parts
+        straight = (self.lengths[n] - 1) * self.layout.pitch
+        corners = np.array([straight, straight + np.pi * self.radius, 2 * straight + np.pi * self.radius])
+        samples = max(2, int(end / (self.radius * np.radians(5))))
+        distance = np.union1d(np.linspace(0, end, samples + 1), corners[corners < end])
+        return self._outline(n, distance).tolist()
+
+    def arc(self, n, k):
+        """Polyline of the outline drawn on stroke n after k steps"""
+        if self.lengths[n] == 1:
+            return (self.centers[n] + self.arcs[k]).tolist()
+        return self._outline_points(n, k * self._perimeter(n) / self.stroke_steps[n])
+
+    def draw(self, canvas, n, width):
+        """Commit finished stroke n to an InkLayer"""
+        if self.lengths[n] == 1:
+            canvas.circle(self.color(n), self.center(n), self.radius, width)
+        else:
+            canvas.polygon(self.color(n), self._outline_points(n, self._perimeter(n)), width)
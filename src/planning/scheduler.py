@@ -0,0 +1,63 @@
+import numpy as np
+from src.settings import ROBOT_SPEED
+
+
+def travel_ticks(distance, speed=ROBOT_SPEED):
+    """Ticks Robot.move_to needs to cover a distance: full steps, then one snapping step."""
+    return np.floor(np.asarray(distance, dtype=float) / speed) + 1
+
+
+def path_ticks(points, speed=ROBOT_SPEED):
+    """Ticks to follow an (x, y, pen) path from its first point, pen-up moves included."""
+    points = np.asarray(points)
+    if len(points) < 2:
+        return 0.0
+    if points.dtype.names:
+        xy = np.column_stack((points['x'], points['y']))
+    else:
+        xy = np.asarray([(p[0], p[1]) for p in points], dtype=float)
+    return float(travel_ticks(np.hypot(*np.diff(xy, axis=0).T), speed).sum())
+
+
+def split_by_time(durations, gaps, parts):
+    """Split jobs into at most `parts` contiguous groups, minimizing the busiest group's time.
+
+    durations[k] is the time to draw job k once the robot is at its start,
+    gaps[k] the travel from the end of job k - 1 to the start of job k. A
+    group's time is its durations plus the gaps inside it (each robot starts
+    on its first job). Greedy packing against a binary-searched makespan is
+    optimal here because extending a group never makes it cheaper.
+    Returns a list of (first, last + 1) index ranges, one per group.
+    """
+    n = len(durations)
+    if n == 0:
+        return []
+
+    def pack(limit):
+        groups = []
+        first, total = 0, durations[0]
+        for k in range(1, n):
+            if total + gaps[k] + durations[k] > limit:
+                groups.append((first, k))
+                first, total = k, durations[k]
+            else:
+                total += gaps[k] + durations[k]
+        groups.append((first, n))
+        return groups
+
+    lo = max(durations)
+    hi = sum(durations) + sum(gaps[1:])
+    # a makespan of `lo` may need more groups than robots; search the smallest one that fits
+    while hi - lo > 0.5:
+        mid = (lo + hi) / 2
+        if len(pack(mid)) <= parts:
+            hi = mid
+        else:
+            lo = mid
+    return pack(hi)
+
+
+def group_time(durations, gaps, group):
+    """Time of one (first, last + 1) group from split_by_time."""
+    first, end = group
+    return durations[first] + sum(gaps[first + 1:end]) + sum(durations[first + 1:end])
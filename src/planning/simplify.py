@@ -0,0 +1,73 @@
+import numpy as np
+from src.planning.motion import MotionTimeline
+
+
+def dedupe(points):
+    """Drop samples that repeat the previous one, like a mouse held still"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 2:
+        return points
+    moved = np.ones(len(points), dtype=bool)
+    moved[1:] = np.any(points[1:] != points[:-1], axis=1)
+    return points[moved]
+
+
+def simplify_stroke(points, tolerance):
+    """Ramer-Douglas-Peucker: fewest points that stay within `tolerance` of the stroke.
+
+    The end points are always kept. A span is split at its point farthest
+    from the chord between its ends until every dropped point is closer than
+    the tolerance; a closed span (both ends equal) uses the distance to its end.
+    """
+    points = dedupe(points)
+    n = len(points)
+    if tolerance <= 0 or n < 3:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    spans = [(0, n - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        start = points[first]
+        chord = points[last] - start
+        offsets = points[first + 1:last] - start
+        length = np.hypot(*chord)
+        if length > 0:
+            distances = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        k = int(np.argmax(distances))
+        if distances[k] > tolerance:
+            split = first + 1 + k
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    return points[keep]
+
+
+def draw_seconds(strokes):
+    """Time the vector robot takes to visit every point of the strokes in order"""
+    strokes = [stroke for stroke in strokes if len(stroke) > 0]
+    if not strokes:
+        return 0.0
+    return MotionTimeline(np.vstack(strokes), tolerance=1).total_seconds
+
+
+def simplify_strokes(strokes, tolerance):
+    """Simplify every stroke; returns the strokes with the draw time before and after"""
+    strokes = [np.asarray(stroke, dtype=float).reshape(-1, 2) for stroke in strokes]
+    simplified = [simplify_stroke(stroke, tolerance) for stroke in strokes if len(stroke) > 0]
+    return simplified, draw_seconds(strokes), draw_seconds(simplified)
+
+
+def report(strokes, simplified, before, after):
+    """One-line summary of a simplification: points and draw time before and after"""
+    captured = sum(len(stroke) for stroke in strokes)
+    kept = sum(len(stroke) for stroke in simplified)
+    fewer = 1 - kept / captured if captured else 0.0
+    saved = 1 - after / before if before else 0.0
+    return (f"{captured} -> {kept} points ({fewer:.0%} fewer), "
+            f"draw time {before:.1f}s -> {after:.1f}s ({saved:.0%} saved)")
@@ -0,0 +1,273 @@
+import math
+import time
+import numpy as np
+
+
+def _dist(a, b):
+    return ((b[0] - a[0])**2 + (b[1] - a[1])**2)**0.5
+
+
+def pen_up_distance(strokes):
+    """Total distance travelled with the pen up between consecutive strokes."""
+    total = 0.0
+    for prev, nxt in zip(strokes, strokes[1:]):
+        total += _dist(prev[-1], nxt[0])
+    return total
+
+
+class EndpointGrid:
+    """Uniform grid over stroke start and end points for nearest-endpoint queries."""
+    def __init__(self, strokes, indices=None):
+        self.strokes = strokes
+        if indices is None:
+            indices = range(len(strokes))
+        self.count = 0
+        self._build(list(indices))
+
+    def _build(self, indices):
+        points = [self.strokes[i][0] for i in indices] + [self.strokes[i][-1] for i in indices]
+        xs = [p[0] for p in points] or [0]
+        ys = [p[1] for p in points] or [0]
+        self.min_x, self.min_y = min(xs), min(ys)
+        width = max(xs) - self.min_x
+        height = max(ys) - self.min_y
+
+        # aim for roughly one endpoint per cell
+        area = max(width * height, 1)
+        self.cell_size = max(math.sqrt(area / max(len(points), 1)), 1.0)
+        self.cols = int(width // self.cell_size) + 1
+        self.rows = int(height // self.cell_size) + 1
+
+        self.cells = {}
+        for i in indices:
+            self.cells.setdefault(self._cell(self.strokes[i][0]), []).append((i, False))
+            self.cells.setdefault(self._cell(self.strokes[i][-1]), []).append((i, True))
+        self.count = len(indices)
+        self.built_count = self.count
+
+    def _cell(self, point):
+        return (int((point[0] - self.min_x) // self.cell_size),
+                int((point[1] - self.min_y) // self.cell_size))
+
+    def remove(self, i):
+        """Remove both endpoints of stroke i."""
+        stroke = self.strokes[i]
+        self.cells[self._cell(stroke[0])].remove((i, False))
+        self.cells[self._cell(stroke[-1])].remove((i, True))
+        self.count -= 1
+
+        # shrink the grid as it empties so rings don't scan mostly empty cells
+        if 0 < self.count < self.built_count // 4:
+            remaining = sorted({i for entries in self.cells.values() for i, _ in entries})
+            self._build(remaining)
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-r, r + 1):
+            yield (cx + dx, cy - r)
+            yield (cx + dx, cy + r)
+        for dy in range(-r + 1, r):
+            yield (cx - r, cy + dy)
+            yield (cx + r, cy + dy)
+
+    def nearest(self, point):
+        """Closest remaining endpoint as (stroke index, reverse), or None when empty.
+
+        Ties go to the lowest stroke index, and to the start before the end of a
+        stroke, which matches a linear scan over the strokes in order.
+        """
+        if self.count == 0:
+            return None
+
+        cx, cy = self._cell(point)
+        max_r = max(abs(cx), abs(self.cols - 1 - cx), abs(cy), abs(self.rows - 1 - cy))
+        best = None
+        for r in range(max_r + 1):
+            for cell in self._ring(cx, cy, r):
+                for i, reverse in self.cells.get(cell, ()):
+                    endpoint = self.strokes[i][-1] if reverse else self.strokes[i][0]
+                    key = (_dist(point, endpoint), i, reverse)
+                    if best is None or key < best:
+                        best = key
+            # anything outside ring r is at least r cells away
+            if best is not None and best[0] < r * self.cell_size:
+                break
+        return best[1], best[2]
+
+
+def order_strokes(strokes):
+    """Greedy nearest-neighbour stroke order that minimizes pen-up travel.
+
+    Each step picks the stroke whose start or end is closest to where the pen
+    currently is, drawing it backwards when its end is closer.
+    Returns the ordered strokes and their total pen-up distance.
+    """
+    strokes = [stroke for stroke in strokes if len(stroke) > 0]
+    if not strokes:
+        return [], 0.0
+
+    grid = EndpointGrid(strokes)
+    grid.remove(0)
+    ordered = [strokes[0]]
+    current_end = strokes[0][-1]
+
+    while grid.count:
+        i, reverse = grid.nearest(current_end)
+        grid.remove(i)
+        next_stroke = strokes[i][::-1] if reverse else strokes[i]
+        ordered.append(next_stroke)
+        current_end = next_stroke[-1]
+
+    return ordered, pen_up_distance(ordered)
+
+
+def _link_lengths(starts, ends):
+    # pen-up distance from the end of each stroke to the start of the next one
+    links = np.zeros(len(starts))
+    if len(starts) > 1:
+        links[:-1] = np.hypot(*(starts[1:] - ends[:-1]).T)
+    return links
+
+
+def improve_order(strokes, max_iterations=10000, time_budget=0.5):
+    """Shorten pen-up travel of an ordered stroke list with 2-opt and Or-opt moves.
+
+    2-opt reverses a run of strokes (drawing each of them backwards), Or-opt
+    moves a run of up to three strokes elsewhere in the tour, optionally
+    reversed. Stops when no move helps or the iteration/time budget runs out.
+    Returns the improved strokes with the pen-up distance before and after.
+    """
+    strokes = [stroke for stroke in strokes if len(stroke) > 0]
+    before = pen_up_distance(strokes)
+    n = len(strokes)
+    if n < 3:
+        return strokes, before, before
+
+    base_starts = np.array([stroke[0] for stroke in strokes], dtype=float)
+    base_ends = np.array([stroke[-1] for stroke in strokes], dtype=float)
+    order = np.arange(n)
+    flipped = np.zeros(n, dtype=bool)
+
+    def endpoints():
+        starts = np.where(flipped[:, None], base_ends[order], base_starts[order])
+        ends = np.where(flipped[:, None], base_starts[order], base_ends[order])
+        return starts, ends
+
+    starts, ends = endpoints()
+    links = _link_lengths(starts, ends)
+    deadline = time.perf_counter() + time_budget
+    iterations = 0
+    improved = True
+
+    while improved and iterations < max_iterations:
+        improved = False
+        for i in range(n):
+            if time.perf_counter() > deadline or iterations >= max_iterations:
+                break
+
+            # 2-opt: reverse positions i..j for every j >= i at once
+            j = np.arange(i, n)
+            has_next = j < n - 1
+            nxt = np.minimum(j + 1, n - 1)
+            old = np.where(has_next, links[j], 0.0)
+            new = np.where(has_next, np.hypot(*(starts[nxt] - starts[i]).T), 0.0)
+            if i > 0:
+                old = old + links[i - 1]
+                new = new + np.hypot(*(ends[j] - ends[i - 1]).T)
+            delta = new - old
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = i + best
+                order[i:j + 1] = order[i:j + 1][::-1]
+                flipped[i:j + 1] = ~flipped[i:j + 1][::-1]
+                starts, ends = endpoints()
+                links = _link_lengths(starts, ends)
+                iterations += 1
+                improved = True
+
+            # Or-opt: move the run i..i+length-1 into the gap after position p
+            for length in (1, 2, 3):
+                last = i + length - 1
+                if last >= n:
+                    break
+                removed = links[i - 1] if i > 0 else 0.0
+                removed += links[last] if last < n - 1 else 0.0
+                if i > 0 and last < n - 1:
+                    removed -= np.hypot(*(starts[last + 1] - ends[i - 1]))
+
+                best_delta, best_move = -1e-9, None
+                for reverse in (False, True):
+                    entry = ends[last] if reverse else starts[i]
+                    exit_ = starts[i] if reverse else ends[last]
+                    # gaps -1..n-1, gap p sits between positions p and p + 1
+                    cost = np.empty(n + 1)
+                    cost[0] = np.hypot(*(starts[0] - exit_))
+                    cost[n] = np.hypot(*(ends[n - 1] - entry))
+                    cost[1:n] = (np.hypot(*(ends[:-1] - entry).T)
+                                 + np.hypot(*(starts[1:] - exit_).T) - links[:-1])
+                    cost[i:last + 2] = np.inf  # gaps touching the run itself
+                    gap = int(np.argmin(cost))
+                    if cost[gap] - removed < best_delta:
+                        best_delta, best_move = cost[gap] - removed, (gap - 1, reverse)
+
+                if best_move is not None:
+                    p, reverse = best_move
+                    run_order = order[i:last + 1]
+                    run_flipped = flipped[i:last + 1]
+                    if reverse:
+                        run_order, run_flipped = run_order[::-1], ~run_flipped[::-1]
+                    rest_order = np.concatenate((order[:i], order[last + 1:]))
+                    rest_flipped = np.concatenate((flipped[:i], flipped[last + 1:]))
+                    at = p + 1 if p < i else p + 1 - length
+                    order = np.concatenate((rest_order[:at], run_order, rest_order[at:]))
+                    flipped = np.concatenate((rest_flipped[:at], run_flipped, rest_flipped[at:]))
+                    starts, ends = endpoints()
+                    links = _link_lengths(starts, ends)
+                    iterations += 1
+                    improved = True
+                    break
+
+    improved_strokes = [strokes[k][::-1] if flip else strokes[k] for k, flip in zip(order, flipped)]
+    return improved_strokes, before, pen_up_distance(improved_strokes)
+
+
+def split_pen_strokes(path):
+    """Split an (x, y, pen) path into strokes at its pen-up breaks.
+
+    Each stroke starts at the last pen-up point before a pen-down run; pen-up
+    moves that don't lead to any ink are dropped.
+    """
+    strokes = []
+    current = []
+    pen_up_point = None
+    for x, y, pen in path:
+        if pen:
+            if not current:
+                current = [pen_up_point] if pen_up_point is not None else []
+            current.append((x, y))
+        else:
+            if current:
+                strokes.append(current)
+                current = []
+            pen_up_point = (x, y)
+    if current:
+        strokes.append(current)
+    return strokes
+
+
+def join_pen_strokes(strokes):
+    """Inverse of split_pen_strokes: pen-up move to each stroke, then draw it."""
+    path = []
+    for stroke in strokes:
+        x, y = stroke[0]
+        path.append((x, y, 0))
+        path.extend((x, y, 1) for x, y in stroke[1:])
+    return path
+
+
+def improve_pen_path(path, max_iterations=10000, time_budget=0.5):
+    """Run improve_order on an (x, y, pen) path, treating pen-up breaks as stroke boundaries."""
+    strokes, before, after = improve_order(split_pen_strokes(path), max_iterations, time_budget)
+    return join_pen_strokes(strokes), before, after
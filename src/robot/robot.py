@@ -1,6 +1,13 @@
 import pygame
-import math
+import time
+import numpy as np
 from src.settings import *
+from src.environment.env import InkLayer, DirtyRects
+from src.planning.stroke_planner import order_strokes, improve_order, pen_up_distance
+from src.planning.motion import MotionTimeline
+from src.planning.raster_planner import RasterLayout, RasterPlan
+from src.utils.fonts import render_text
+from src.utils.path_buffer import PathBuffer
 
 class Robot:
   
@@ -12,141 +19,232 @@ class Robot:
     self.grid_spacing = 2 * PIXEL_SIZE 
     self.angle = 0  
     self.drawing_step = 40 
-    self.completed_pixels = []  
+    self.completed_pixels = 0  # strokes of the raster plan finished, in visiting order
+    self.raster_step = 0  # steps taken around the current stroke
+    self.raster_plan = None  
+    self.raster_canvas = None  # finished strokes are committed here once
+    self.raster_source = None
+    self.live_arc = None  # (stroke, steps) of the outline being drawn
+    self.raster_tick = 0
+    self.vector_tick = 0
     self.x = WIDTH // 2
     self.y = HEIGHT // 2
     self.speed = ROBOT_SPEED
+    self.dirty = DirtyRects()  # what changed on screen since the last frame
     
   def move_to(self, target_x, target_y):
+        self.x, self.y = self.next_position(target_x, target_y)
+
+  def next_position(self, target_x, target_y):
+        # where one move_to step towards the target would put the robot
         dx = target_x - self.x
         dy = target_y - self.y
         dist = (dx**2 + dy**2)**0.5
         if dist < self.speed:## move robot immediatley without interpolation
-            self.x, self.y = target_x, target_y
-        else:
-            self.x += dx / dist * self.speed
-            self.y += dy / dist * self.speed
+            return target_x, target_y
+        return self.x + dx / dist * self.speed, self.y + dy / dist * self.speed
+
+  def get_raster_layout(self, img_arr):
+    # grid for this image, scaled down from the default pitch until it fits the paper
+    return RasterLayout(img_arr.shape[0], img_arr.shape[1], PAPER_RECT, self.grid_spacing)
 
   def get_pixel_center(self, row, col, img_arr):
     if row % 2 == 0:  
       actual_col = col
     else:  
       actual_col = img_arr.shape[1] - 1 - col
-    
-    start_x = WIDTH // 2 - self.pixel_size * (IMAGE_RESOLUTION - 2)
-    start_y = HEIGHT // 2 - self.pixel_size * (IMAGE_RESOLUTION - 1)
-    center_x = start_x + actual_col * self.grid_spacing
-    center_y = start_y + row * self.grid_spacing
-    return center_x, center_y
+    return self.get_raster_layout(img_arr).center(row, actual_col)
+
+  def get_raster_bounds(self, img_arr):
+    # area covered by the whole pixel grid, including the circle outlines
+    return self.get_raster_layout(img_arr).bounds()
 
   def draw_robot(self, screen):
-      pygame.draw.rect(screen, PURPLE, (self.x, self.y, ROBOT_SIZE, ROBOT_SIZE), 0, 25) 
+      self.dirty.show("robot", pygame.draw.rect(screen, PURPLE, (self.x, self.y, ROBOT_SIZE, ROBOT_SIZE), 0, 25))
+
+  def dirty_rects(self):
+    # the robot and live line where they were and are now, and any new ink
+    rects = self.dirty.take()
+    for canvas in (self.raster_canvas, getattr(self, 'vector_canvas', None)):
+      if canvas is not None:
+        rects.extend(canvas.changes())
+    return rects
+
+  def plan_raster(self, img_arr):
+    # plan every pixel of an image without touching the robot, so it can run off the UI thread
+    plan = RasterPlan(img_arr, self.get_raster_layout(img_arr), self.drawing_step, RASTER_PENS, TOUR_TIME_BUDGET,
+                      RASTER_BACKGROUND, RASTER_BLANK_TOLERANCE, RASTER_MERGE_RUNS)
+    print(f"Raster plan: {plan.report()}")
+    return plan
+
+  def start_raster(self, img_arr, plan=None):
+    # new image: start from the top-left on a fresh sheet, planning it here unless it was done already
+    self.raster_plan = plan if plan is not None else self.plan_raster(img_arr)
+    self.raster_layout = self.raster_plan.layout
+    self.raster_step = 0
+    self.completed_pixels = 0
+    self.live_arc = None
+    self.raster_tick = 0
+    self.raster_source = img_arr
+    self.raster_canvas = InkLayer(self.raster_layout.bounds(), WHITE)
+
+  def _plan_for(self, img_arr):
+    # the current plan when it was made for this image, None when it has to be planned
+    return self.raster_plan if self.raster_source is img_arr else None
+
+  def is_raster_complete(self, img_arr):
+    return (self.raster_plan is not None and self.raster_source is img_arr and
+            self.completed_pixels >= len(self.raster_plan))
+
+  def raster_total_ticks(self, img_arr):
+    # every stroke takes one tick per step around its outline, plus one to commit it
+    if self.raster_canvas is None or self.raster_source is not img_arr:
+      self.start_raster(img_arr, self._plan_for(img_arr))
+    return self.raster_plan.total_ticks
+
+  def raster_ticks_per_frame(self, img_arr):
+    # large grids take several ticks per frame so they finish in about the time of a default one
+    return max(1, img_arr.shape[0] * img_arr.shape[1] // RASTER_FRAME_PIXELS)
+
+  def raster_eta(self, img_arr, ticks_per_frame=1):
+    # seconds left until the image is finished
+    return max(self.raster_total_ticks(img_arr) - self.raster_tick, 0) / ticks_per_frame / FPS
+
+  def seek_raster(self, img_arr, tick):
+    # jump to the state after `tick` ticks, found by a binary search over the strokes' finish ticks
+    tick = max(0, min(tick, self.raster_total_ticks(img_arr)))
+    plan = self.raster_plan
+    stroke = int(np.searchsorted(plan.finish_ticks, tick, side='right'))
+    if stroke > 0 and tick == plan.finish_ticks[stroke - 1]:
+      # replay the stroke that just finished too, so the robot ends where it finished it
+      stroke -= 1
+
+    if stroke < self.completed_pixels:
+      # going back redraws from a fresh sheet with the same plan, replanning would freeze the frame
+      self.start_raster(img_arr, plan)
+    for n in range(self.completed_pixels, stroke):
+      plan.draw(self.raster_canvas, n, self.raster_layout.line_width)
+    self.completed_pixels = stroke
+    self.raster_step = 0
+    self.raster_tick = int(plan.finish_ticks[stroke - 1]) if stroke > 0 else 0
 
-  def draw_raster(self, screen, img_arr):
+    # the unfinished stroke is a handful of steps, play them normally
+    for _ in range(tick - self.raster_tick):
+      self.update_raster(img_arr)
+
+  def update_raster(self, img_arr):
+    # advance the raster drawing by one tick
+    if self.raster_canvas is None or self.raster_source is not img_arr:
+      self.start_raster(img_arr, self._plan_for(img_arr))
+
+    self.live_arc = None
+    # if we're finished, return
+    if self.is_raster_complete(img_arr):
+      return
+    self.raster_tick += 1
+    
+    n = self.completed_pixels
+    step = self.raster_step
+    
+    # robot position on the outline
+    if step < self.raster_plan.steps(n):
+      pen_x, pen_y = self.raster_plan.position(n, step)
+      self.x = pen_x - ROBOT_SIZE // 2
+      self.y = pen_y - ROBOT_SIZE // 2
+
+      # the outline drawn so far is rendered live until the stroke is finished
+      if step > 0:
+        self.live_arc = (n, step)
+
+      self.raster_step += 1
+    else:
+      self.raster_plan.draw(self.raster_canvas, n, self.raster_layout.line_width)
+      self.completed_pixels += 1
+      self.raster_step = 0
+
+  def advance_raster(self, img_arr, ticks=1, budget=RASTER_FRAME_BUDGET):
+    # several ticks in one frame, stopping early once the time budget is spent
+    deadline = time.perf_counter() + budget
+    for _ in range(ticks):
+      self.update_raster(img_arr)
+      if time.perf_counter() > deadline:
+        break
+
+  def draw_raster(self, screen, img_arr, ticks=1):
     if img_arr is None:
       self.current_row = 0
       self.current_col = 0
-      self.completed_pixels = []
-      font = pygame.font.SysFont('Serif', 24)
-      text = font.render("Drag and drop an image here", True, BLACK)
+      self.completed_pixels = 0
+      self.raster_canvas = None
+      text = render_text("Drag and drop an image here", 'Serif', 24)
       text_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2))
-      screen.blit(text, text_rect)
+      self.dirty.show("hint", screen.blit(text, text_rect), text)
       return
 
-    for px, py, color in self.completed_pixels:
-      pygame.draw.circle(screen, color, (px, py), self.pixel_size, 3)
-
-    # if we're finished, return
-    total_pixels = img_arr.shape[0] * img_arr.shape[1]
-    if len(self.completed_pixels) >= total_pixels:
+    self.advance_raster(img_arr, ticks)
+    self.raster_canvas.blit(screen)
+    if self.is_raster_complete(img_arr):
       return
-    
-    # get pixel color and center
-    if self.current_row % 2 == 0:  # even rows: left to right
-      actual_col = self.current_col
-    else:  # odd rows: right to left
-      actual_col = img_arr.shape[1] - 1 - self.current_col
-    color = tuple(img_arr[self.current_row][actual_col])
-    center_x, center_y = self.get_pixel_center(self.current_row, self.current_col, img_arr)
-    
-    # calc robot position on the circle
-    if self.angle < 360:
-      rad = math.radians(self.angle - 90)  
-      self.x = center_x + self.pixel_size * math.cos(rad) - ROBOT_SIZE // 2
-      self.y = center_y + self.pixel_size * math.sin(rad) - ROBOT_SIZE // 2
-
-      if self.angle > 0:
-        points = []
-        num_points = max(2, int(self.angle / 5))
-        for i in range(num_points + 1):
-          angle = -90 + (self.angle * i / num_points)
-          rad = math.radians(angle)
-          px = center_x + self.pixel_size * math.cos(rad)
-          py = center_y + self.pixel_size * math.sin(rad)
-          points.append((px, py))
-
-        if len(points) > 1:
-          pygame.draw.lines(screen, color, False, points, 3)
-
-      self.angle += self.drawing_step
-    else:
-      self.completed_pixels.append((center_x, center_y, color))
-      self.angle = 0
-      
-      self.current_col += 1
-      if self.current_col >= img_arr.shape[1]:
-        self.current_col = 0
-        self.current_row += 1
+
+    if self.live_arc is not None:
+      n, step = self.live_arc
+      arc_rect = pygame.draw.lines(screen, self.raster_plan.color(n), False, self.raster_plan.arc(n, step),
+                                   max(1, self.raster_layout.line_width))
+      self.dirty.show("arc", arc_rect, self.live_arc)
     
     self.draw_robot(screen)
 
-  def draw_vector(self, screen):
-    if not hasattr(self, 'vector_path'):
+  def is_vector_complete(self):
+    return not hasattr(self, 'vector_path') or self.current_segment_index >= self.vector_path.stroke_count
+
+  def update_vector(self):
+    # advance the vector drawing by one tick
+    if self.is_vector_complete():
       return
     
-    # Draw all completed segments
-    for i in range(len(self.completed_segments)):
-      stroke = self.completed_segments[i]
-      if len(stroke) > 1:
-        pygame.draw.lines(screen, BLACK, False, stroke, 3)
+    self.vector_tick += 1
+    current_stroke = self.vector_path.stroke(self.current_segment_index)
     
-    # Draw current segment being drawn
-    if self.current_segment_index < len(self.vector_path):
-      current_stroke = self.vector_path[self.current_segment_index]
+    # Move robot to next point
+    if self.current_point_index < len(current_stroke):
+      target_x, target_y = current_stroke[self.current_point_index].tolist()
       
-      # Draw completed part of current stroke
-      if self.current_point_index > 0:
-        points_to_draw = current_stroke[:self.current_point_index + 1]
-        if len(points_to_draw) > 1:
-          pygame.draw.lines(screen, BLACK, False, points_to_draw, 3)
+      # Move robot towards target
+      self.move_to(target_x, target_y)
       
-      # Move robot to next point
-      if self.current_point_index < len(current_stroke):
-        target_x, target_y = current_stroke[self.current_point_index]
-        
-        # Move robot towards target
-        self.move_to(target_x, target_y)
-        
-        # Draw line from previous point to current robot position if we're drawing
+      # Check if robot reached the target
+      if abs(self.x - target_x) < 1 and abs(self.y - target_y) < 1:
+        # settle on the point, so the next segment starts where the motion timeline expects
+        self.x, self.y = target_x, target_y
+        # commit the finished segment to the canvas once
         if self.current_point_index > 0:
-          prev_x, prev_y = current_stroke[self.current_point_index - 1]
-          pygame.draw.line(screen, BLACK, (prev_x, prev_y), (self.x, self.y), 3)
+          prev_x, prev_y = current_stroke[self.current_point_index - 1].tolist()
+          self.vector_canvas.line(BLACK, (prev_x, prev_y), (target_x, target_y), 3)
+        self.current_point_index += 1
+        self.vector_reached += 1
         
-        # Check if robot reached the target
-        if abs(self.x - target_x) < 1 and abs(self.y - target_y) < 1:
-          self.current_point_index += 1
-          
-          # If finished current stroke
-          if self.current_point_index >= len(current_stroke):
-            self.completed_segments.append(current_stroke[:])
-            self.current_segment_index += 1
-            self.current_point_index = 0
-            
-            # Move to start of next stroke if there is one
-            if self.current_segment_index < len(self.vector_path):
-              next_stroke = self.vector_path[self.current_segment_index]
-              if len(next_stroke) > 0:
-                self.x, self.y = next_stroke[0]
+        # If finished current stroke
+        if self.current_point_index >= len(current_stroke):
+          self.completed_segments = self.vector_path.prefix(self.current_segment_index + 1)
+          self.current_segment_index += 1
+          self.current_point_index = 0
+          # the robot now travels pen-up to the start of the next stroke
+
+  def draw_vector(self, screen):
+    if not hasattr(self, 'vector_path'):
+      return
+    
+    self.update_vector()
+    
+    # Completed strokes live on the vector canvas, only the live segment is drawn per frame
+    self.vector_canvas.blit(screen)
+    
+    # Draw line from previous point to current robot position if we're drawing
+    if not self.is_vector_complete() and self.current_point_index > 0:
+      current_stroke = self.vector_path.stroke(self.current_segment_index)
+      prev_x, prev_y = current_stroke[self.current_point_index - 1].tolist()
+      line_rect = pygame.draw.line(screen, BLACK, (prev_x, prev_y), (self.x, self.y), 3)
+      self.dirty.show("line", line_rect, (prev_x, prev_y, self.x, self.y))
     
     self.draw_robot(screen)
   
@@ -156,48 +254,64 @@ class Robot:
     if not strokes or len(strokes) == 0:
       return
     
-    optimized_strokes = []
-    remaining_strokes = [stroke[:] for stroke in strokes] 
+    optimized_strokes, self.pen_up_distance = order_strokes(strokes)
+    print(f"Vector plan: {len(optimized_strokes)} strokes, pen-up travel "
+          f"{pen_up_distance(strokes):.0f}px -> {self.pen_up_distance:.0f}px")
     
-    current_stroke = remaining_strokes.pop(0)
-    optimized_strokes.append(current_stroke)
-    current_end = current_stroke[-1]
-    
-    while remaining_strokes:
-      min_dist = float('inf')
-      min_idx = 0
-      reverse = False
-      
-      for i, stroke in enumerate(remaining_strokes):
-        # check distance to start of stroke
-        dist_to_start = ((stroke[0][0] - current_end[0])**2 + (stroke[0][1] - current_end[1])**2)**0.5
-        if dist_to_start < min_dist:
-          min_dist = dist_to_start
-          min_idx = i
-          reverse = False
-        
-        # check distance to end of stroke to see if it's better to draw it backward
-        dist_to_end = ((stroke[-1][0] - current_end[0])**2 + (stroke[-1][1] - current_end[1])**2)**0.5
-        if dist_to_end < min_dist:
-          min_dist = dist_to_end
-          min_idx = i
-          reverse = True
-      
-      next_stroke = remaining_strokes.pop(min_idx)
-      if reverse:
-        next_stroke = next_stroke[::-1]  # reverse the stroke
-      
-      optimized_strokes.append(next_stroke)
-      current_end = next_stroke[-1]
+    # optional 2-opt / Or-opt pass to remove the long jumps greedy leaves behind
+    if VECTOR_TOUR_OPTIMIZE:
+      optimized_strokes, before, self.pen_up_distance = improve_order(
+        optimized_strokes, time_budget=TOUR_TIME_BUDGET)
+      print(f"Vector plan: tour improvement {before:.0f}px -> {self.pen_up_distance:.0f}px")
     
-    self.vector_path = optimized_strokes
+    # one flat buffer instead of a list of tuples per stroke; finished strokes are a view of its prefix
+    self.vector_path = PathBuffer(optimized_strokes)
     self.current_segment_index = 0
     self.current_point_index = 0
-    self.completed_segments = []
+    self.completed_segments = self.vector_path.prefix(0)
+    # slightly larger than the paper so line caps along the border are not clipped
+    self.vector_canvas = InkLayer(PAPER_RECT.inflate(6, 6))
     
     # set robot to start of first stroke
-    if len(self.vector_path) > 0 and len(self.vector_path[0]) > 0:
-      self.x, self.y = self.vector_path[0][0]
+    if len(self.vector_path) > 0:
+      self.x, self.y = self.vector_path[0]
+    
+    # arrival tick of every point, for seeking and ETAs
+    self.vector_points = self.vector_path.points
+    self.vector_stroke_ends = self.vector_path.stroke_ends
+    self.vector_motion = MotionTimeline(self.vector_points, start=(self.x, self.y), tolerance=1)
+    self.vector_reached = 0
+    self.vector_tick = 0
+    print(f"Vector plan: {self.vector_motion.total_seconds:.1f}s to draw")
+
+  def vector_eta(self):
+    # seconds left until the drawing is finished
+    return self.vector_motion.eta(self.vector_tick) if hasattr(self, 'vector_motion') else 0
+
+  def seek_vector(self, tick):
+    # jump to the state after `tick` ticks without stepping through them
+    if not hasattr(self, 'vector_motion'):
+      return
+    tick = max(0, min(tick, self.vector_motion.total_ticks))
+    reached = self.vector_motion.index_at(tick)
+    
+    # the canvas only grows, going back means redrawing it
+    if reached < self.vector_reached:
+      self.vector_canvas.clear()
+      self.vector_reached = 0
+    for k in range(self.vector_reached, reached):
+      stroke = int(np.searchsorted(self.vector_stroke_ends, k, side='right'))
+      stroke_start = self.vector_stroke_ends[stroke - 1] if stroke > 0 else 0
+      if k > stroke_start:
+        self.vector_canvas.line(BLACK, self.vector_points[k - 1], self.vector_points[k], 3)
+    self.vector_reached = reached
+    
+    self.current_segment_index = int(np.searchsorted(self.vector_stroke_ends, reached, side='right'))
+    stroke_start = self.vector_stroke_ends[self.current_segment_index - 1] if self.current_segment_index > 0 else 0
+    self.current_point_index = int(reached - stroke_start)
+    self.completed_segments = self.vector_path.prefix(self.current_segment_index)
+    self.x, self.y = self.vector_motion.position_at(tick)
+    self.vector_tick = tick
 
   def draw_text(self, screen):
     pass
\ No newline at end of file
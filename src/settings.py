@@ -1,3 +1,4 @@
+import os
 import pygame
 
 
@@ -18,9 +19,46 @@ ROBOT_SIZE = 25
 ROBOT_SPEED = 6
 ROBOT_ANGLE = 90
 
+FPS = 60  # Simulation ticks per second; every tick moves a robot by ROBOT_SPEED
+SEEK_STEP = 10 * FPS  # Ticks skipped by the fast-forward key
+IMAGE_READY = pygame.USEREVENT + 1  # Posted by the background image loader
+
+TEXT_CACHE_SIZE = 256  # Rendered UI strings kept for reuse
+
+# Only the parts of the window that changed are sent to the display
+DIRTY_RECTS = True
+IDLE_FPS = 10  # Frame rate while nothing on screen changes
+DIRTY_RECT_LIMIT = 32  # More changed regions than this are sent as their union
+INK_CHANGE_LIMIT = 64  # Ink layers report more changes than this as the whole layer
+
+# Resized images are cached by content hash, in memory and as .npy files on disk
+IMAGE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "artistic-robot", "images")
+IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+IMAGE_CACHE_ITEMS = 32
+
+# Cooperative mode
+COOP_ROBOTS = 2
+COOP_WORK_STEALING = True  # idle robots take queued letters from busy ones
+COOP_COLLISION_AVOIDANCE = True
+ROBOT_SEPARATION = 24  # minimum distance between two robots' pens
+ROBOT_PATIENCE = 2 * 60  # ticks a robot waits before it is let through anyway
+MAX_COOP_ROBOTS = 8
+COOP_FRAME_BUDGET = 0.008  # seconds per frame spent catching up on skipped ticks with collision avoidance
+ROBOT_COLORS = [RED, BLUE, (0, 150, 0), (255, 140, 0), PURPLE, (0, 160, 160), (200, 0, 150), (120, 80, 20)]
+
 DRAWING_WIDTH = 3
 IMAGE_RESOLUTION = 32
-PIXEL_SIZE = 10
+PIXEL_SIZE = 10  # Largest circle radius; bigger grids shrink to fit PAPER_RECT
+
+# Raster jobs
+RASTER_RESOLUTIONS = [32, 64, 128, 256]  # picked with the number keys in raster mode
+RASTER_KEEP_ASPECT = True  # resolution is the longer side, the other follows the image
+RASTER_FRAME_PIXELS = 32 * 32  # grids larger than this draw several ticks per frame...
+RASTER_FRAME_BUDGET = 0.008  # ...but stop after this many seconds of a frame
+RASTER_PENS = 8  # Colors the image is reduced to, one pen each; 0 draws every pixel in its own color
+RASTER_BACKGROUND = WHITE
+RASTER_BLANK_TOLERANCE = 24  # Pixels this close (RGB distance) to the background are skipped; -1 draws them all
+RASTER_MERGE_RUNS = True  # Draw horizontal runs of one pen as a single outline
 
 # Notebook/Border Settings
 PAPER_COLOR = (240, 240, 240) # Off-white for the paper
@@ -34,6 +72,15 @@ PAPER_RECT = pygame.Rect(
 )
 
 LINE_SPACING = 90  # How far down to jump for a new line
+TEXT_LOOKAHEAD = 2000  # Path points kept buffered ahead of the writing robot
+
+# Pen-up travel optimization (2-opt / Or-opt after the greedy stroke order)
+VECTOR_TOUR_OPTIMIZE = True
+TEXT_TOUR_OPTIMIZE = False
+TOUR_TIME_BUDGET = 0.5  # seconds
+
+# Freehand strokes are simplified before the robot redraws them
+VECTOR_SIMPLIFY_TOLERANCE = 1.0  # px a simplified stroke may stray from the captured one; 0 only drops repeated samples
 
 MENU_BUTTONS = [
             {"text": "Raster Draw", "action": "raster"},
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+# Run without a window unless a video driver was chosen explicitly
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from src.settings import *
+from src.robot.robot import Robot
+from src.utils.img_utils import image_to_rgb_array
+from src.planning.simplify import simplify_strokes, report
+from src.text.text_engine import TextEngine
+from src.text.text_robot import TextRobot
+from src.cooperative.cooperative_robot import CooperativeRobot
+from src.environment.env import Border
+
+
+class SimulationResult:
+    """Finished sheets of a headless run along with its timing"""
+    def __init__(self, pages, ticks, wall_seconds):
+        self.pages = pages
+        self.ticks = ticks
+        self.simulated_seconds = ticks / FPS
+        self.wall_seconds = wall_seconds
+
+    def save(self, path):
+        """Save every sheet as an image, numbering them when there is more than one"""
+        if len(self.pages) == 1:
+            pygame.image.save(self.pages[0], path)
+            return [path]
+        root, ext = os.path.splitext(path)
+        paths = []
+        for number, page in enumerate(self.pages, start=1):
+            page_path = f"{root}_page{number}{ext}"
+            pygame.image.save(page, page_path)
+            paths.append(page_path)
+        return paths
+
+    def __str__(self):
+        speedup = self.simulated_seconds / self.wall_seconds if self.wall_seconds > 0 else float("inf")
+        return (f"{len(self.pages)} page(s), {self.ticks} ticks "
+                f"({self.simulated_seconds:.1f}s simulated) in {self.wall_seconds:.2f}s "
+                f"({speedup:.0f}x real time)")
+
+
+def _init():
+    if not pygame.get_init():
+        pygame.init()
+
+
+def _sheet(draw_ink, border=True):
+    """Render finished ink onto a blank white window-sized sheet"""
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(WHITE)
+    if border:
+        Border().draw(surface)
+    draw_ink(surface)
+    return surface
+
+
+def _run(update, is_complete, max_ticks):
+    """Step a simulation at a fixed timestep, as fast as possible"""
+    ticks = 0
+    while not is_complete() and ticks < max_ticks:
+        update()
+        ticks += 1
+    if ticks >= max_ticks:
+        print(f"Simulation stopped after {max_ticks} ticks")
+    return ticks
+
+
+def simulate_raster(img_arr, max_ticks=10**7):
+    """Paint an image array with the raster robot"""
+    _init()
+    start = time.perf_counter()
+    robot = Robot()
+    robot.start_raster(img_arr)
+    ticks = _run(lambda: robot.update_raster(img_arr),
+                 lambda: robot.is_raster_complete(img_arr), max_ticks)
+    pages = [_sheet(robot.raster_canvas.blit, border=False)]
+    return SimulationResult(pages, ticks, time.perf_counter() - start)
+
+
+def simulate_vector(strokes, max_ticks=10**7, simplify=None):
+    """Trace vector strokes, given as lists of (x, y) points, simplified first with a tolerance"""
+    _init()
+    start = time.perf_counter()
+    if simplify is not None:
+        simplified, before, after = simplify_strokes(strokes, simplify)
+        print(f"Vector input: {report(strokes, simplified, before, after)}")
+        strokes = simplified
+    robot = Robot()
+    robot.init_vector_drawing(strokes)
+    ticks = _run(robot.update_vector, robot.is_vector_complete, max_ticks)
+    draw_ink = robot.vector_canvas.blit if hasattr(robot, 'vector_canvas') else (lambda surface: None)
+    pages = [_sheet(draw_ink)]
+    return SimulationResult(pages, ticks, time.perf_counter() - start)
+
+
+def simulate_text(text, max_ticks=10**7):
+    """Write text with a single robot"""
+    _init()
+    start = time.perf_counter()
+    text_robot = TextRobot(Robot(), TextEngine(spacing=10, scale=1.5))
+    pages = []
+    text_robot.on_page_complete = lambda draw_ink: pages.append(_sheet(draw_ink))
+    text_robot.start(text)
+    ticks = _run(text_robot.update, text_robot.is_complete, max_ticks)
+    pages.append(_sheet(text_robot.ink.blit))
+    return SimulationResult(pages, ticks, time.perf_counter() - start)
+
+
+def simulate_cooperative(text, num_robots=COOP_ROBOTS, max_ticks=10**7):
+    """Write text with several robots sharing each sheet"""
+    _init()
+    start = time.perf_counter()
+    cooperative = CooperativeRobot(pygame.Surface((WIDTH, HEIGHT)), TextEngine(spacing=10, scale=1.5))
+    cooperative.set_robot_count(num_robots)
+    pages = []
+    cooperative.on_page_complete = lambda draw_ink: pages.append(_sheet(draw_ink))
+    cooperative.set_text(text)
+    ticks = _run(cooperative.update, cooperative.is_complete, max_ticks)
+    pages.append(_sheet(cooperative.draw_ink))
+    return SimulationResult(pages, ticks, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a drawing without a window and save the result")
+    parser.add_argument("mode", choices=["raster", "vector", "text", "cooperative"])
+    parser.add_argument("source", help="image path for raster, JSON stroke file for vector, text otherwise")
+    parser.add_argument("--resolution", type=int, default=IMAGE_RESOLUTION, help="raster grid size (longer side)")
+    parser.add_argument("--robots", type=int, default=COOP_ROBOTS, help="robots in cooperative mode")
+    parser.add_argument("--out", default="drawing.png", help="where to save the finished sheet")
+    parser.add_argument("--max-ticks", type=int, default=10**7, help="stop after this many ticks")
+    parser.add_argument("--simplify", type=float, default=None, metavar="TOLERANCE",
+                        help="simplify vector strokes first, keeping them within this many pixels")
+    args = parser.parse_args(argv)
+
+    if args.mode == "raster":
+        img_arr = image_to_rgb_array(args.source, args.resolution, keep_aspect=RASTER_KEEP_ASPECT)
+        result = simulate_raster(img_arr, args.max_ticks)
+    elif args.mode == "vector":
+        with open(args.source) as f:
+            strokes = [[tuple(point) for point in stroke] for stroke in json.load(f)]
+        result = simulate_vector(strokes, args.max_ticks, args.simplify)
+    elif args.mode == "text":
+        result = simulate_text(args.source, args.max_ticks)
+    else:
+        result = simulate_cooperative(args.source, args.robots, args.max_ticks)
+
+    print(f"Simulation: {result}")
+    for path in result.save(args.out):
+        print("Saved", path)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
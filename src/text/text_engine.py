@@ -1,5 +1,41 @@
+import numpy as np
 from src.text.letters import LETTER_PATHS
 from src.settings import *
+from src.planning.stroke_planner import improve_pen_path
+from src.planning.motion import arrival_ticks
+
+# One path sample: position and pen state (0 = up, 1 = down)
+PATH_DTYPE = np.dtype([('x', 'f8'), ('y', 'f8'), ('pen', 'u1')])
+
+
+class Glyph:
+    """A letter's samples relative to its top-left corner, laid out once per (char, scale, step)."""
+    def __init__(self, samples, width):
+        self.samples = samples
+        self.width = width
+        # first and last sample, for the pen-up moves between glyphs
+        if len(samples):
+            self.start = (samples['x'][0].item(), samples['y'][0].item())
+            self.end = (samples['x'][-1].item(), samples['y'][-1].item())
+        self._ticks = {}
+
+    def ticks(self, tolerance=0):
+        """Ticks to follow the samples once the robot is at the first one"""
+        if tolerance not in self._ticks:
+            xy = np.column_stack((self.samples['x'], self.samples['y']))
+            self._ticks[tolerance] = int(arrival_ticks(xy[:-1], xy[1:], tolerance=tolerance).sum())
+        return self._ticks[tolerance]
+
+    def placed_at(self, x, y):
+        """Copy of the samples translated to the cursor position."""
+        points = self.samples.copy()
+        points['x'] += x
+        points['y'] += y
+        return points
+
+
+# Shared by every TextEngine, keyed by (char, scale, step)
+_GLYPH_CACHE = {}
 
 class TextEngine:
     def __init__(self, spacing=20, scale=1):
@@ -20,13 +56,50 @@ class TextEngine:
             points.append((xi, yi, pen))
         return points
 
+    def interpolate_batch(self, segments, step=2, as_tuples=False):
+        """Same samples as interpolate, for many (x1, y1, x2, y2, pen) segments in one pass."""
+        segments = np.asarray(segments, dtype=float).reshape(-1, 5)
+        x1, y1, x2, y2, pen = segments.T
+        dx = x2 - x1
+        dy = y2 - y1
+        dist = (dx**2 + dy**2)**0.5
+        # zero-length segments give a single sample at their start
+        steps = np.maximum((dist / step).astype(int), 1)
+
+        seg = np.repeat(np.arange(len(segments)), steps)
+        first = np.cumsum(steps) - steps
+        i = np.arange(len(seg)) - first[seg] + 1
+
+        points = np.empty(len(seg), dtype=PATH_DTYPE)
+        points['x'] = x1[seg] + dx[seg] * i / steps[seg]
+        points['y'] = y1[seg] + dy[seg] * i / steps[seg]
+        points['pen'] = pen[seg]
+        return points.tolist() if as_tuples else points
+
+    def get_glyph(self, char, step=2):
+        """Cached, pre-scaled and pre-interpolated samples for one character."""
+        key = (char, self.scale, step)
+        glyph = _GLYPH_CACHE.get(key)
+        if glyph is None:
+            letter_points = LETTER_PATHS.get(char)
+            if letter_points:
+                # Pen up to the start of the letter, then its strokes
+                sx, sy, _ = letter_points[0]
+                segments = [(sx * self.scale, sy * self.scale, sx * self.scale, sy * self.scale, 0)]
+                for (x1, y1, _), (x2, y2, pen) in zip(letter_points, letter_points[1:]):
+                    segments.append((x1 * self.scale, y1 * self.scale,
+                                     x2 * self.scale, y2 * self.scale, pen))
+                samples = self.interpolate_batch(segments, step)
+                width = max(p[0] for p in letter_points) * self.scale
+            else:
+                samples = np.empty(0, dtype=PATH_DTYPE)
+                width = 15 * self.scale # Default width for unknown characters (like space)
+            glyph = _GLYPH_CACHE[key] = Glyph(samples, width)
+        return glyph
+
     def get_char_width(self, char):
         """Helper to get width of a single character."""
-        if char in LETTER_PATHS:
-            letter_points = LETTER_PATHS[char]
-            if letter_points:
-                return max(p[0] for p in letter_points) * self.scale
-        return 15 * self.scale # Default width for unknown characters (like space)
+        return self.get_glyph(char).width
 
     def get_word_width(self, word):
         """Calculates total width of a word."""
@@ -35,9 +108,14 @@ class TextEngine:
             width += self.get_char_width(char) + self.spacing
         return width
 
-    def build_path(self, text, paper_rect, line_spacing=60):
-        final_points = []
-        
+    def layout_pages(self, text, paper_rect, line_spacing=60):
+        """Place every character of the text, starting a new sheet whenever a page fills up.
+
+        Returns a list of pages; each page is a list of words and each word a
+        list of (char, x, y) letter positions. Only the first page can be empty,
+        when the text has nothing to draw. The whole text is laid out in
+        one pass, so page boundaries are known before anything is drawn.
+        """
         # Margins inside the paper
         margin_x = 20
         margin_y = 10
@@ -51,126 +129,124 @@ class TextEngine:
         
         current_x = start_x
         current_y = start_y
+        pages = [[]]
         
-        words = text.split(' ')
+        def next_line():
+            nonlocal current_x, current_y
+            current_x = start_x
+            current_y += line_spacing
+            # Continue on a fresh sheet once we hit the bottom
+            if current_y > max_y:
+                pages.append([])
+                current_y = start_y
         
-        for word in words:
+        for word in text.split(' '):
             word_width = self.get_word_width(word)
             
             # --- CHECK IF WORD FITS ---
             if current_x + word_width > max_x:
-                # Move to next line
-                current_x = start_x
-                current_y += line_spacing
-            
-            # Check Vertical Limit (Stop if we hit bottom)
-            if current_y > max_y:
-                print("End of page reached. Stopping.")
-                break 
+                next_line()
 
-            # Draw the word
+            # Place the word
+            placed = []
             for char in word.upper():
                 char_width = self.get_char_width(char)
                 
                 # Check if this specific letter hits the edge
                 if current_x + char_width > max_x:
-                    current_x = start_x
-                    current_y += line_spacing
-                    if current_y > max_y: break # Stop if bottom
+                    # the rest of the word may end up on the next page
+                    if placed:
+                        pages[-1].append(placed)
+                        placed = []
+                    next_line()
                 
-                # Retrieve strokes
                 if char in LETTER_PATHS:
-                    letter_points = LETTER_PATHS[char]
-                    
-                    # Move Pen Up to start of letter
-                    local_sx, local_sy, _ = letter_points[0]
-                    abs_sx = local_sx * self.scale + current_x
-                    abs_sy = local_sy * self.scale + current_y
-                    final_points.append((abs_sx, abs_sy, 0)) # 0 = Pen Up
-                    
-                    # Draw strokes
-                    for i in range(1, len(letter_points)):
-                        p1 = letter_points[i-1]
-                        p2 = letter_points[i]
-                        
-                        x1 = p1[0] * self.scale + current_x
-                        y1 = p1[1] * self.scale + current_y
-                        x2 = p2[0] * self.scale + current_x
-                        y2 = p2[1] * self.scale + current_y
-                        
-                        final_points.extend(self.interpolate(x1, y1, x2, y2, p2[2]))
+                    placed.append((char, current_x, current_y))
                 
                 # Advance cursor
                 current_x += char_width + self.spacing
             
+            if placed:
+                pages[-1].append(placed)
+            
             # Add Space after word
             current_x += self.spacing * 2
             
             # Safety check for space hitting edge
             if current_x > max_x:
-                current_x = start_x
-                current_y += line_spacing
-            
-        return final_points
-    
-
-    def build_path_coop_multiline(self, text, start_x, start_y, paper_rect, line_spacing):
-        """Build path for cooperative robots with multi-line support"""
-        final_points = []
-        
-        margin_x = 20
-        max_x = paper_rect.right - margin_x
-        max_y = paper_rect.bottom - 20
-        
-        current_x = start_x
-        current_y = start_y
-        base_x = paper_rect.left + margin_x  # For line wrapping
+                next_line()
         
-        for char in text.upper():
-            if char == ' ':
-                current_x += self.spacing * 2
-                # Check if space causes line wrap
-                if current_x > max_x:
-                    current_x = base_x
-                    current_y += line_spacing
-                continue
-            
-            if char not in LETTER_PATHS:
-                current_x += self.spacing
-                continue
-            
-            letter_points = LETTER_PATHS[char]
-            char_width = max(px for px, py, pen in letter_points) * self.scale
-            
-            # Check if character causes line wrap
-            if current_x + char_width > max_x:
-                current_x = base_x
-                current_y += line_spacing
-            
-            # Check vertical limit
-            if current_y > max_y:
-                print("End of page reached for cooperative robot.")
-                break
-            
-            # Pen-up move to start of letter
-            x_start, y_start, _ = letter_points[0]
-            x_start = x_start * self.scale + current_x
-            y_start = y_start * self.scale + current_y
-            final_points.append((x_start, y_start, 0))  # pen up
+        # Runs of spaces wrap lines too and can fill a sheet with nothing on it
+        return [page for page in pages if page] or [[]]
+
+    def glyphs_path(self, placements, as_array=True):
+        """Path through cached letter strokes placed at the given (char, x, y) positions."""
+        pieces = [self.get_glyph(char).placed_at(x, y) for char, x, y in placements]
+        points = np.concatenate(pieces) if pieces else np.empty(0, dtype=PATH_DTYPE)
+        return points if as_array else points.tolist()
+
+    def build_pages(self, text, paper_rect, line_spacing=60, optimize=False, as_array=False):
+        """One path per page, as (x, y, pen) tuples or PATH_DTYPE arrays with as_array."""
+        pages = []
+        for page in self.layout_pages(text, paper_rect, line_spacing):
+            points = self.glyphs_path([glyph for word in page for glyph in word])
             
-            # Letter strokes
-            for i in range(1, len(letter_points)):
-                x1, y1, pen1 = letter_points[i-1]
-                x2, y2, pen2 = letter_points[i]
-                
-                x1 = x1 * self.scale + current_x
-                y1 = y1 * self.scale + current_y
-                x2 = x2 * self.scale + current_x
-                y2 = y2 * self.scale + current_y
-                
-                final_points.extend(self.interpolate(x1, y1, x2, y2, pen2, step=2))
+            # Reorder letter strokes to cut pen-up travel
+            if optimize:
+                optimized, before, after = improve_pen_path(points.tolist(), time_budget=TOUR_TIME_BUDGET)
+                print(f"Text plan (page {len(pages) + 1}): pen-up travel {before:.0f}px -> {after:.0f}px")
+                points = np.array(optimized, dtype=PATH_DTYPE)
             
-            # Advance position
-            current_x += char_width + self.spacing
+            pages.append(points if as_array else points.tolist())
+        return pages
+
+    def build_path(self, text, paper_rect, line_spacing=60, optimize=False, as_array=False):
+        """Path for the first page of the text; see build_pages for texts longer than a page."""
+        pages = self.build_pages(text, paper_rect, line_spacing, optimize, as_array)
+        if len(pages) > 1:
+            print(f"Text needs {len(pages)} pages, returning the first one.")
+        return pages[0]
+
+    def page_ticks(self, pages, tolerance=0):
+        """Ticks to draw every page of a layout, without sampling its paths.
+
+        Adds up cached glyph ticks and the pen-up moves between glyphs, plus a
+        tick for each page turn, the way a robot following iter_pages counts
+        them. With optimize the strokes of a word are reordered, so for such
+        paths this is an estimate.
+        """
+        placed = [(page_number, char, x, y) for page_number, page in enumerate(pages)
+                  for word in page for char, x, y in word]
+        glyphs = {char: self.get_glyph(char) for char in {p[1] for p in placed}}
+        placed = [p for p in placed if len(glyphs[p[1]].samples)]
         
-        return final_points
\ No newline at end of file
+        totals = np.ones(len(pages), dtype=np.int64)  # the page turn before every page...
+        totals[:1] = 0                                 # ...but the first
+        if placed:
+            page_of = np.array([p[0] for p in placed])
+            xy = np.array([(p[2], p[3]) for p in placed], dtype=float)
+            starts = np.array([glyphs[p[1]].start for p in placed]) + xy
+            ends = np.array([glyphs[p[1]].end for p in placed]) + xy
+            np.add.at(totals, page_of, [glyphs[p[1]].ticks(tolerance) for p in placed])
+            # the first glyph is where the robot starts, one tick; every other one is reached from the last
+            totals[page_of[0]] += 1
+            np.add.at(totals, page_of[1:], arrival_ticks(ends[:-1], starts[1:], tolerance=tolerance))
+        return totals.tolist()
+
+    def iter_pages(self, pages, optimize=False):
+        """Lazily yield (page number, PATH_DTYPE array) chunks, one per word of a page layout.
+
+        Only the word being sampled is held in memory, so a robot can start
+        drawing before the rest of a long text has been processed.
+        """
+        for page_number, page in enumerate(pages):
+            for word in page:
+                chunk = self.glyphs_path(word)
+                if optimize:
+                    points, _, _ = improve_pen_path(chunk.tolist(), time_budget=TOUR_TIME_BUDGET)
+                    chunk = np.array(points, dtype=PATH_DTYPE)
+                yield page_number, chunk
+
+    def iter_path(self, text, paper_rect, line_spacing=60, optimize=False):
+        """iter_pages over the layout of text."""
+        return self.iter_pages(self.layout_pages(text, paper_rect, line_spacing), optimize)
@@ -0,0 +1,227 @@
+import math
+import numpy as np
+from src.settings import *
+from src.environment.env import InkLayer, DirtyRects
+from src.planning.motion import arrival_ticks
+from src.utils.fonts import render_text
+from src.utils.path_buffer import PathBuffer
+
+# Pen value of the marker between two pages, placed where the last page ended
+PAGE_BREAK = 2
+
+class TextRobot:
+    """Single robot writing text whose path is streamed in while it draws, page by page"""
+    def __init__(self, robot, text_engine, lookahead=TEXT_LOOKAHEAD):
+        self.robot = robot
+        self.text_engine = text_engine
+        self.lookahead = lookahead
+        
+        # Written ink is kept on the paper layer, so reached points can be dropped
+        self.ink = InkLayer(PAPER_RECT)
+        self.on_page_complete = None  # called with a draw(surface) function before a sheet is cleared
+        self.dirty = DirtyRects()
+        self.reset()
+    
+    def reset(self):
+        """Forget the current text"""
+        self.stream = None
+        self.points = PathBuffer(pen=True)  # window of upcoming (x, y, pen) points
+        self.index = 0    # next point to reach within the window
+        self.page = 0
+        self.page_count = 0
+        self.streamed_page = 0
+        self.pages = []
+        self.page_ticks = None  # ticks per page, worked out from the layout on demand
+        self.tick = 0
+        self.reached_tick = 0   # tick at which the last point was reached
+        self.ink.clear()
+    
+    def start(self, text):
+        """Start writing text; pages are laid out up front, paths sampled lazily word by word"""
+        self.reset()
+        self.pages = self.text_engine.layout_pages(text, PAPER_RECT, LINE_SPACING)
+        self.page_count = len(self.pages)
+        self._restart()
+    
+    def _restart(self):
+        """Go back to the first point of the laid out text, on a blank sheet"""
+        self.stream = self.text_engine.iter_pages(self.pages, optimize=TEXT_TOUR_OPTIMIZE)
+        self.points = PathBuffer(pen=True)
+        self.index = 0
+        self.page = 0
+        self.streamed_page = 0
+        self.tick = 0
+        self.reached_tick = 0
+        self.ink.clear()
+        self._fill()
+        if self.points:
+            self.robot.x, self.robot.y, _ = self.points[0]
+    
+    def _fill(self):
+        """Pull path chunks until the look-ahead window is full"""
+        # Drop points that are already drawn, keeping the last one for the next segment
+        if self.index > self.lookahead:
+            self.points.drop(self.index - 1)
+            self.index = 1
+        
+        while self.stream is not None and len(self.points) - self.index < self.lookahead:
+            item = next(self.stream, None)
+            if item is None:
+                self.stream = None
+            else:
+                page, chunk = item
+                if page != self.streamed_page:
+                    # the page turns where the last sheet ended, or where the robot is
+                    x, y, _ = self.points[-1] if len(self.points) else (self.robot.x, self.robot.y, None)
+                    self.points.append(x, y, PAGE_BREAK)
+                    self.streamed_page = page
+                self.points.extend(chunk)
+    
+    def _reach(self):
+        """Finish the current point: draw its segment, or turn the page on a marker"""
+        self.reached_tick = self.tick
+        
+        target_x, target_y, pen = self.points[self.index]
+        
+        # Page finished: continue on a fresh sheet
+        if pen == PAGE_BREAK:
+            self._turn_page()
+            self.index += 1
+            return
+        
+        if pen == 1 and self.index > 0:
+            prev_x, prev_y, prev_pen = self.points[self.index - 1]
+            if prev_pen != PAGE_BREAK:
+                self.ink.line(BLACK, (prev_x, prev_y), (target_x, target_y), 2)
+        self.index += 1
+    
+    def _turn_page(self):
+        if self.on_page_complete is not None:
+            self.on_page_complete(self.ink.blit)
+        self.ink.clear()
+        self.page += 1
+        print(f"Starting page {self.page + 1}/{self.page_count}")
+    
+    def _draw_segments(self, segments):
+        for segment in segments:
+            for x1, y1, x2, y2 in segment.tolist():
+                self.ink.line(BLACK, (x1, y1), (x2, y2), 2)
+    
+    def update(self):
+        """Move the robot one step along the path"""
+        self._fill()
+        if self.index >= len(self.points):
+            return
+        self.tick += 1
+        
+        target_x, target_y, pen = self.points[self.index]
+        if pen == PAGE_BREAK:
+            self._reach()
+            return
+        
+        # Move robot towards target
+        self.robot.move_to(target_x, target_y)
+        
+        # If robot arrived at point, draw the segment once and go to next point
+        if abs(self.robot.x - target_x) < 2 and abs(self.robot.y - target_y) < 2:
+            self._reach()
+    
+    def seek(self, tick):
+        """Jump to the state after `tick` ticks without stepping the robot through them.
+
+        Arrival ticks are worked out one look-ahead window at a time, so no
+        more of the path is held than while drawing normally. Ink is only
+        drawn for the sheet the robot ends up on, unless on_page_complete
+        wants every finished sheet.
+        """
+        tick = max(0, tick)
+        # going back means writing the text again from the start
+        if tick < self.tick:
+            self._restart()
+        
+        pending = []  # (x1, y1, x2, y2) segments reached on the current sheet, not drawn yet
+        while True:
+            self._fill()
+            if self.index >= len(self.points):
+                break
+            points = self.points.points
+            upcoming = points[self.index:]
+            # the first point costs a tick even though the robot starts on it
+            previous = points[self.index - 1:-1] if self.index > 0 else np.vstack((upcoming[:1], upcoming[:-1]))
+            arrivals = self.reached_tick + np.cumsum(arrival_ticks(previous, upcoming, tolerance=2))
+            count = int(np.searchsorted(arrivals, tick, side='right'))
+            if count:
+                self._skip(count, pending)
+                self.tick = self.reached_tick = int(arrivals[count - 1])
+            if count < len(upcoming):
+                break
+        self._draw_segments(pending)
+        
+        if self.index >= len(self.points):
+            # past the end: the text is done at the tick its last point was reached
+            self.tick = self.reached_tick
+            if self.points:
+                self.robot.x, self.robot.y, _ = self.points[-1]
+            return
+        
+        # on the way to the next point
+        prev_x, prev_y, _ = self.points[self.index - 1] if self.index > 0 else self.points[0]
+        target_x, target_y, _ = self.points[self.index]
+        distance = math.hypot(target_x - prev_x, target_y - prev_y)
+        travelled = min((tick - self.reached_tick) * self.robot.speed, distance)
+        share = travelled / distance if distance > 0 else 0.0
+        self.robot.x = prev_x + (target_x - prev_x) * share
+        self.robot.y = prev_y + (target_y - prev_y) * share
+        self.tick = tick
+    
+    def _skip(self, count, pending):
+        """Reach the next `count` points at once, collecting their segments in `pending`"""
+        pens = self.points.pens
+        points = self.points.points
+        reached = self.index + np.arange(count)
+        # a point is drawn from the one before it, unless that one turned the page
+        drawn = reached[(pens[reached] == 1) & (reached > 0)]
+        drawn = drawn[pens[drawn - 1] != PAGE_BREAK]
+        for page_break in reached[pens[reached] == PAGE_BREAK].tolist():
+            before = drawn[drawn < page_break]
+            pending.append(np.hstack((points[before - 1], points[before])))
+            if self.on_page_complete is not None:
+                self._draw_segments(pending)
+            # a sheet nobody sees again needs no ink
+            pending.clear()
+            drawn = drawn[drawn > page_break]
+            self._turn_page()
+        pending.append(np.hstack((points[drawn - 1], points[drawn])))
+        self.index += count
+    
+    def fast_forward(self, ticks):
+        """Skip ahead by `ticks` ticks"""
+        self.seek(self.tick + ticks)
+    
+    def finish(self):
+        """Jump straight to the finished text"""
+        self.seek(math.inf)
+    
+    def eta(self):
+        """Seconds until the text is finished, from the layout; nothing is sampled for it"""
+        if self.page_ticks is None:
+            self.page_ticks = self.text_engine.page_ticks(self.pages, tolerance=2)
+        return max(sum(self.page_ticks) - self.tick, 0) / FPS
+    
+    def draw(self, screen):
+        """Draw the written ink and the robot"""
+        self.ink.blit(screen)
+        self.robot.draw_robot(screen)
+        
+        if self.page_count > 1:
+            page_surface = render_text(f"Page {self.page + 1}/{self.page_count}", 'Arial', 24)
+            page_rect = screen.blit(page_surface, (PAPER_RECT.right - page_surface.get_width(), PAPER_RECT.top - 35))
+            self.dirty.show("page", page_rect, page_surface)
+    
+    def dirty_rects(self):
+        """Regions changed since the last frame: new ink and the page label; the robot reports its own"""
+        return self.ink.changes() + self.dirty.take()
+    
+    def is_complete(self):
+        """Check if the whole text has been written"""
+        return self.stream is None and self.index >= len(self.points)
@@ -0,0 +1,44 @@
+import pygame
+from collections import OrderedDict
+from src.settings import BLACK, TEXT_CACHE_SIZE
+
+# SysFont looks the font up on the system every call, so each font is created once
+_FONTS = {}
+
+# Rendered text surfaces, least recently used first
+_SURFACES = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_font(name, size, bold=False, italic=False):
+    """Shared pygame font"""
+    key = (name, size, bold, italic)
+    font = _FONTS.get(key)
+    if font is None:
+        font = _FONTS[key] = pygame.font.SysFont(name, size, bold=bold, italic=italic)
+    return font
+
+
+def render_text(text, name, size, color=BLACK, bold=False, italic=False, antialias=True):
+    """Rendered surface for a string, only re-rendered when it was not drawn recently.
+
+    The surface is shared between callers, so it must not be drawn on.
+    """
+    key = (name, size, bold, italic, text, tuple(color), antialias)
+    surface = _SURFACES.get(key)
+    if surface is not None:
+        _SURFACES.move_to_end(key)
+        _stats["hits"] += 1
+        return surface
+
+    _stats["misses"] += 1
+    surface = get_font(name, size, bold, italic).render(text, antialias, color)
+    _SURFACES[key] = surface
+    if len(_SURFACES) > TEXT_CACHE_SIZE:
+        _SURFACES.popitem(last=False)
+    return surface
+
+
+def cache_stats():
+    """Hits, misses and size of the text surface cache"""
+    return dict(_stats, size=len(_SURFACES), fonts=len(_FONTS))
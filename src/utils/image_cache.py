@@ -0,0 +1,148 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from src.settings import IMAGE_CACHE_DIR, IMAGE_CACHE_BYTES, IMAGE_CACHE_ITEMS
+from src.utils.img_utils import image_to_rgb_array
+
+CACHE_VERSION = 1  # bump when the ingestion output changes
+
+
+class ImageCache:
+    """Resized image arrays keyed by file content, resolution and resample mode.
+
+    Recent arrays stay in memory; everything is also written as .npy under
+    `directory` and memory-mapped on a hit. The directory is kept under
+    `max_bytes` by deleting the least recently used files.
+    """
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_BYTES, memory_items=IMAGE_CACHE_ITEMS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()  # key -> array, most recent last
+        self.digests = {}  # path -> (size, mtime, digest), so unchanged files are not hashed again
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            print(f"Image cache: {directory} is not writable ({e}), caching in memory only")
+            self.directory = None
+
+    def _digest(self, path):
+        stat = os.stat(path)
+        known = self.digests.get(path)
+        if known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        self.digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def key(self, path, n, resample=Image.BILINEAR, keep_aspect=False):
+        shape = f"{n}a" if keep_aspect else f"{n}"
+        return f"{self._digest(path)}-{shape}-{Image.Resampling(resample).name.lower()}-v{CACHE_VERSION}"
+
+    def _file(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def load(self, path, n, resample=Image.BILINEAR, keep_aspect=False):
+        """image_to_rgb_array through the cache"""
+        start = time.perf_counter()
+        with self.lock:
+            key = self.key(path, n, resample, keep_aspect)
+            arr = self.memory.get(key)
+            if arr is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                self.hit_seconds += time.perf_counter() - start
+                return arr
+
+            file = self._file(key) if self.directory is not None else None
+            if file is not None and os.path.exists(file):
+                arr = np.load(file, mmap_mode="r")
+                os.utime(file)  # mark as recently used for eviction
+                self.disk_hits += 1
+                self._remember(key, arr)
+                self.hit_seconds += time.perf_counter() - start
+                return arr
+
+        arr = image_to_rgb_array(path, n, resample, keep_aspect)
+        with self.lock:
+            if self.directory is not None:
+                self._store(key, arr)
+            self._remember(key, arr)
+            self.misses += 1
+            self.miss_seconds += time.perf_counter() - start
+        return arr
+
+    def _remember(self, key, arr):
+        self.memory[key] = arr
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _store(self, key, arr):
+        # write next to the final name, then rename, so readers never see half a file
+        file = self._file(key)
+        partial = file + f".{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            np.save(f, arr)
+        os.replace(partial, file)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue  # still mapped somewhere, try again on the next store
+            self.memory.pop(name[:-len(".npy")], None)
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.directory is None:
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def hit_rate(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "hit_ms": 1000 * self.hit_seconds / hits if hits else 0.0,
+            "miss_ms": 1000 * self.miss_seconds / self.misses if self.misses else 0.0,
+        }
+
+    def __str__(self):
+        stats = self.stats()
+        return (f"{stats['hit_rate']:.0%} hit rate ({stats['memory_hits']} memory, {stats['disk_hits']} disk, "
+                f"{stats['misses']} misses), {stats['hit_ms']:.1f}ms per hit, {stats['miss_ms']:.1f}ms per miss")
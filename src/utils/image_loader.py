@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from src.settings import IMAGE_READY
+from src.utils.image_cache import ImageCache
+
+
+class ImageLoader:
+    """Decodes dropped images on a worker thread and posts IMAGE_READY when done.
+
+    Only the newest request matters: a new drop cancels a pending one and the
+    result of one already running is dropped instead of being posted. Slow
+    work on the decoded array (like planning a raster) can run on the worker
+    too and comes back as the event's `prepared`.
+    """
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else ImageCache()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-loader")
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.future = None
+        self.path = None
+
+    def load(self, path, n, keep_aspect=False, prepare=None):
+        """Start loading path as an n * n array (n on the longer side with keep_aspect), replacing any earlier request
+
+        prepare(array), when given, is called on the worker once the image is loaded.
+        """
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            if self.future is not None:
+                self.future.cancel()
+            self.path = path
+            self.future = self.executor.submit(self._work, path, n, keep_aspect, prepare, generation)
+
+    def _work(self, path, n, keep_aspect, prepare, generation):
+        prepared = None
+        try:
+            arr = self.cache.load(path, n, keep_aspect=keep_aspect)
+            error = None
+            print(f"Image cache: {self.cache}")
+            if prepare is not None:
+                prepared = prepare(arr)
+        except Exception as e:
+            arr, error = None, e
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.future = None
+        pygame.event.post(pygame.event.Event(IMAGE_READY, path=path, array=arr, prepared=prepared, error=error))
+
+    def is_busy(self):
+        with self.lock:
+            return self.future is not None
+
+    def cancel(self):
+        """Forget the current request, its result will not be posted"""
+        with self.lock:
+            self.generation += 1
+            if self.future is not None:
+                self.future.cancel()
+            self.future = None
+            self.path = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
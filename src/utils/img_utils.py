@@ -1,13 +1,108 @@
+import os
 from PIL import Image
 import numpy as np
 
+# raw formats that are streamed band by band instead of decoded
+RAW_EXTENSIONS = {".npy", ".ppm", ".pgm", ".pnm"}
 
-def image_to_rgb_array(path, n):
-    # returns an n * n matrix of rgb values
-    img = Image.open(path).convert("RGB")
-    img = img.resize((n, n), Image.BILINEAR)  # downscale w/ averaging
-    arr = np.array(img)  # arr[n][n][3]
+
+def target_size(width, height, n, keep_aspect=False):
+    # (columns, rows) of the grid: n * n, or n along the longer side when keeping the aspect ratio
+    if not keep_aspect:
+        return n, n
+    scale = n / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def image_to_rgb_array(path, n, resample=Image.BILINEAR, keep_aspect=False):
+    # returns an n * n matrix of rgb values (rows * columns with keep_aspect)
+    ext = os.path.splitext(path)[1].lower()
+    if ext in RAW_EXTENSIONS:
+        raw = locate_raw_image(path)
+        if raw is not None:
+            height, width = raw[2][:2]
+            return downscale_raw(path, raw, *target_size(width, height, n, keep_aspect))
+
+    img = Image.open(path)
+    size = target_size(img.width, img.height, n, keep_aspect)
+    # let the decoder skip detail we will not keep (JPEG decodes at 1/2, 1/4 or 1/8 scale)
+    img.draft("RGB", size)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    # reduce by whole factors first, then a small resample
+    img = img.resize(size, resample, reducing_gap=2.0)
+    arr = np.array(img.convert("RGB"))  # arr[rows][columns][3]
     return arr
 
-    
 
+def read_pnm_fields(f, count):
+    # header fields one byte at a time: the pixels start right after the whitespace ending the last one
+    fields, token = [], b""
+    while len(fields) < count:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte == b"#" or byte.isspace():
+            if token:
+                fields.append(token)
+                token = b""
+            if byte == b"#":
+                # comments run to the end of the line
+                while byte not in (b"\n", b"\r", b""):
+                    byte = f.read(1)
+        else:
+            token += byte
+    return fields
+
+
+def locate_raw_image(path):
+    # locate the pixels of a raw image: (offset, dtype, shape, maxval), None if the format is not raw
+    with open(path, "rb") as f:
+        if path.lower().endswith(".npy"):
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if fortran_order or len(shape) not in (2, 3):
+                return None
+            maxval = np.iinfo(dtype).max if dtype.kind in "ui" else 1.0  # floats are taken as 0..1
+            return f.tell(), dtype, shape, maxval
+
+        magic = f.read(2)
+        if magic not in (b"P5", b"P6"):
+            return None  # ascii variants go through Pillow
+        # header: magic, width, height, maxval separated by whitespace, comments start with '#'
+        fields = read_pnm_fields(f, 3)
+        if fields is None:
+            return None
+        offset = f.tell()
+    width, height, maxval = (int(field) for field in fields)
+    dtype = np.dtype(np.uint8) if maxval < 256 else np.dtype(">u2")
+    shape = (height, width, 3) if magic == b"P6" else (height, width)
+    return offset, dtype, shape, maxval
+
+
+def downscale_raw(path, raw, cols, rows):
+    # area average into rows * cols, streaming one band of source rows at a time
+    offset, dtype, shape, maxval = raw
+    height, width = shape[:2]
+    row_size = int(np.prod(shape[1:]))
+    scale = 255.0 / maxval
+    col_edges = np.linspace(0, width, cols + 1).astype(int)
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    arr = np.empty((rows, cols, 3), dtype=np.uint8)
+    with open(path, "rb") as f:
+        for i in range(rows):
+            top, bottom = row_edges[i], max(row_edges[i + 1], row_edges[i] + 1)
+            f.seek(offset + top * row_size * dtype.itemsize)
+            band = np.fromfile(f, dtype=dtype, count=(bottom - top) * row_size)
+            band = band.reshape((bottom - top,) + tuple(shape[1:])).astype(np.float32)
+            if band.ndim == 2:
+                band = band[:, :, None]
+            band = band[:, :, :3].sum(axis=0)
+            # sum every column block of the band, then divide by its area
+            sums = np.add.reduceat(band, np.minimum(col_edges[:-1], width - 1), axis=0)
+            counts = (bottom - top) * np.maximum(np.diff(col_edges), 1)
+            arr[i] = np.clip(sums / counts[:, None] * scale, 0, 255).round().astype(np.uint8)
+    return arr
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+class PathBuffer:
+    """Points of many strokes in one flat array, with the offset where each stroke starts.
+
+    Takes the place of lists of (x, y) or (x, y, pen) tuples: a point costs
+    16 bytes (17 with a pen column) instead of a tuple and its floats.
+    Strokes, reversed strokes and prefixes are views into the buffer, not
+    copies. Points added after the last end_stroke() form an open stroke.
+
+    The arrays grow by doubling; views taken before a growth keep the old
+    memory alive and stay valid, they just don't see later points.
+    """
+    def __init__(self, strokes=(), pen=False, capacity=64):
+        self._xy = np.empty((capacity, 2))
+        self._pen = np.empty(capacity, dtype=np.uint8) if pen else None
+        self._offsets = np.zeros(16, dtype=np.int64)  # _offsets[s] is the first point of stroke s
+        self.size = 0
+        self.stroke_count = 0
+        for stroke in strokes:
+            self.add_stroke(stroke)
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed > len(self._xy):
+            capacity = max(needed, 2 * len(self._xy), 16)
+            xy = np.empty((capacity, 2))
+            xy[:self.size] = self._xy[:self.size]
+            self._xy = xy
+            if self._pen is not None:
+                pen = np.empty(capacity, dtype=np.uint8)
+                pen[:self.size] = self._pen[:self.size]
+                self._pen = pen
+
+    def append(self, x, y, pen=1):
+        self._reserve(1)
+        self._xy[self.size] = x, y
+        if self._pen is not None:
+            self._pen[self.size] = pen
+        self.size += 1
+
+    def extend(self, points, pen=1):
+        """Add points from a PATH_DTYPE array, an (n, 2) / (n, 3) array or a list of tuples"""
+        points = np.asarray(points)
+        if len(points) == 0:
+            return
+        if points.dtype.names:
+            xy = np.column_stack((points['x'], points['y']))
+            pens = points['pen']
+        else:
+            points = points.astype(float).reshape(len(points), -1)
+            xy = points[:, :2]
+            pens = points[:, 2] if points.shape[1] > 2 else pen
+        self._reserve(len(xy))
+        self._xy[self.size:self.size + len(xy)] = xy
+        if self._pen is not None:
+            self._pen[self.size:self.size + len(xy)] = pens
+        self.size += len(xy)
+
+    def end_stroke(self):
+        """Close the open stroke; does nothing when it is empty"""
+        if self.size == self._offsets[self.stroke_count]:
+            return
+        if self.stroke_count + 2 > len(self._offsets):
+            offsets = np.zeros(2 * len(self._offsets), dtype=np.int64)
+            offsets[:self.stroke_count + 1] = self._offsets[:self.stroke_count + 1]
+            self._offsets = offsets
+        self.stroke_count += 1
+        self._offsets[self.stroke_count] = self.size
+
+    def add_stroke(self, points):
+        self.extend(points)
+        self.end_stroke()
+
+    def drop(self, n):
+        """Forget the first n points, keeping what is left of their strokes"""
+        n = min(n, self.size)
+        if n <= 0:
+            return
+        self._xy[:self.size - n] = self._xy[n:self.size]
+        if self._pen is not None:
+            self._pen[:self.size - n] = self._pen[n:self.size]
+        self.size -= n
+        bounds = np.maximum(self._offsets[:self.stroke_count + 1] - n, 0)
+        # strokes that now start at 0 and are empty go away
+        first = int(np.searchsorted(bounds, 0, side='right')) - 1
+        self.stroke_count -= first
+        self._offsets[:self.stroke_count + 1] = bounds[first:]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, k):
+        """Point k as an (x, y) or (x, y, pen) tuple"""
+        if k < 0:
+            k += self.size
+        if not 0 <= k < self.size:
+            raise IndexError("point index out of range")
+        x, y = self._xy.item(k, 0), self._xy.item(k, 1)
+        return (x, y) if self._pen is None else (x, y, self._pen.item(k))
+
+    @property
+    def points(self):
+        """(n, 2) view of every point"""
+        return self._xy[:self.size]
+
+    @property
+    def pens(self):
+        return self._pen[:self.size] if self._pen is not None else None
+
+    @property
+    def stroke_ends(self):
+        """Index one past the last point of every finished stroke"""
+        return self._offsets[1:self.stroke_count + 1]
+
+    def stroke(self, i, reverse=False):
+        """(n, 2) view of stroke i, back to front with reverse"""
+        points = self._xy[self._offsets[i]:self._offsets[i + 1]]
+        return points[::-1] if reverse else points
+
+    def strokes(self):
+        return [self.stroke(i) for i in range(self.stroke_count)]
+
+    @property
+    def open_stroke(self):
+        return self._xy[self._offsets[self.stroke_count]:self.size]
+
+    def prefix(self, n):
+        """The first n strokes, sharing this buffer's memory"""
+        view = PathBuffer.__new__(PathBuffer)
+        view.size = int(self._offsets[n])
+        view.stroke_count = n
+        # exact-size views: anything added to the prefix reallocates instead of writing into this buffer
+        view._xy = self._xy[:view.size]
+        view._pen = self._pen[:view.size] if self._pen is not None else None
+        view._offsets = self._offsets[:n + 1]
+        for array in (view._xy, view._pen, view._offsets):
+            if array is not None:
+                array.flags.writeable = False
+        return view
+
+    def tolist(self):
+        """Points as a list of tuples"""
+        if self._pen is None:
+            return [tuple(point) for point in self.points.tolist()]
+        return list(zip(*self.points.T.tolist(), self.pens.tolist()))
+
+    @property
+    def nbytes(self):
+        return self._xy.nbytes + self._offsets.nbytes + (self._pen.nbytes if self._pen is not None else 0)
@@ -0,0 +1,320 @@
+import os
+import random
+
+# no window needed, pygame draws to memory surfaces
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import pytest
+
+from src.settings import *
+from src.simulation import simulate_text, simulate_vector, simulate_cooperative
+from src.planning.scheduler import split_by_time, group_time
+from src.planning.stroke_planner import order_strokes, improve_order, pen_up_distance
+from src.planning.simplify import simplify_stroke
+from src.planning.motion import MotionTimeline
+from src.utils.path_buffer import PathBuffer
+from src.robot.robot import Robot
+from src.text.text_engine import TextEngine
+from src.text.text_robot import TextRobot
+from src.cooperative.cooperative_robot import CooperativeRobot
+
+
+def random_strokes(count, seed=0, grid=False):
+    rng = random.Random(seed)
+    coord = (lambda: float(rng.randrange(0, 20) * 10)) if grid else (lambda: rng.uniform(0, 500))
+    return [[(coord(), coord()) for _ in range(rng.randint(1, 5))] for _ in range(count)]
+
+
+def has_ink(surface):
+    pixels = pygame.surfarray.array3d(surface)
+    return bool((pixels < 128).all(axis=2).any())
+
+
+# --- headless simulation ---
+
+def test_simulate_text():
+    result = simulate_text("HELLO WORLD")
+    assert result.ticks > 0
+    assert len(result.pages) == 1
+    assert has_ink(result.pages[0])
+
+
+def test_simulate_text_pages_match_layout():
+    # whitespace alone must not open a sheet
+    result = simulate_text("HI" + " " * 600 + "THERE")
+    assert len(result.pages) == 2
+
+
+def test_simulate_vector():
+    strokes = [[(300.0, 300.0), (400.0, 300.0), (400.0, 400.0)], [(500.0, 500.0), (600.0, 550.0)]]
+    result = simulate_vector(strokes)
+    assert result.ticks > 0
+    assert has_ink(result.pages[0])
+
+
+def test_simulate_cooperative():
+    result = simulate_cooperative("HELLO ROBOTS", num_robots=2)
+    assert 0 < result.ticks < 10**7
+    assert has_ink(result.pages[0])
+
+
+# --- scheduling ---
+
+def brute_force_makespan(durations, gaps, parts):
+    n = len(durations)
+    best = float("inf")
+    # every way of cutting 0..n into at most `parts` contiguous groups
+    for mask in range(1 << (n - 1)):
+        cuts = [k + 1 for k in range(n - 1) if mask >> k & 1]
+        if len(cuts) + 1 > parts:
+            continue
+        bounds = [0] + cuts + [n]
+        groups = list(zip(bounds, bounds[1:]))
+        best = min(best, max(group_time(durations, gaps, group) for group in groups))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_split_by_time(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 9)
+    durations = [float(rng.randint(1, 50)) for _ in range(n)]
+    gaps = [0.0] + [float(rng.randint(0, 20)) for _ in range(n - 1)]
+    parts = rng.randint(1, 4)
+
+    groups = split_by_time(durations, gaps, parts)
+    assert 1 <= len(groups) <= parts
+    # contiguous and covering every job
+    assert groups[0][0] == 0 and groups[-1][1] == n
+    assert all(a[1] == b[0] for a, b in zip(groups, groups[1:]))
+    makespan = max(group_time(durations, gaps, group) for group in groups)
+    assert makespan <= brute_force_makespan(durations, gaps, parts) + 0.5
+
+
+def test_split_by_time_empty():
+    assert split_by_time([], [], 3) == []
+
+
+# --- stroke ordering ---
+
+def linear_order(strokes):
+    """The greedy order as a plain scan over every remaining stroke"""
+    strokes = [stroke for stroke in strokes if len(stroke) > 0]
+    if not strokes:
+        return [], 0.0
+    remaining = list(range(1, len(strokes)))
+    ordered = [strokes[0]]
+    while remaining:
+        end = ordered[-1][-1]
+        _, i, reverse = min((np.hypot(point[0] - end[0], point[1] - end[1]), i, reverse)
+                            for i in remaining
+                            for reverse, point in ((False, strokes[i][0]), (True, strokes[i][-1])))
+        remaining.remove(i)
+        ordered.append(strokes[i][::-1] if reverse else strokes[i])
+    return ordered, pen_up_distance(ordered)
+
+
+@pytest.mark.parametrize("seed, grid", [(0, False), (1, False), (2, True), (3, True)])
+def test_order_strokes_matches_linear_scan(seed, grid):
+    # grid coordinates make ties, which must break the same way
+    strokes = random_strokes(120, seed, grid)
+    ordered, distance = order_strokes(strokes)
+    expected, expected_distance = linear_order(strokes)
+    assert ordered == expected
+    assert distance == pytest.approx(expected_distance)
+
+
+def test_improve_order():
+    ordered, _ = order_strokes(random_strokes(80, seed=4))
+    improved, before, after = improve_order(ordered, time_budget=5.0)
+    assert before == pytest.approx(pen_up_distance(ordered))
+    assert after == pytest.approx(pen_up_distance(improved))
+    assert after <= before
+    # the same strokes, some drawn backwards
+    either_way = lambda strokes: sorted(min(tuple(s), tuple(s[::-1])) for s in strokes)
+    assert either_way(improved) == either_way(ordered)
+
+
+# --- simplification ---
+
+def point_to_polyline(point, polyline):
+    best = float("inf")
+    for a, b in zip(polyline, polyline[1:]):
+        ab, ap = b - a, point - a
+        t = np.clip(np.dot(ap, ab) / max(np.dot(ab, ab), 1e-12), 0, 1)
+        best = min(best, np.hypot(*(ap - t * ab)))
+    return best
+
+
+def test_simplify_stroke():
+    rng = np.random.default_rng(5)
+    t = np.linspace(0, 2 * np.pi, 400)
+    points = np.column_stack((200 + 100 * np.cos(t), 200 + 60 * np.sin(3 * t))) + rng.normal(0, 0.3, (400, 2))
+    simplified = simplify_stroke(points, 1.0)
+    assert len(simplified) < len(points) // 4
+    assert np.array_equal(simplified[0], points[0]) and np.array_equal(simplified[-1], points[-1])
+    assert max(point_to_polyline(point, simplified) for point in points) <= 1.0 + 1e-9
+
+
+def test_simplify_stroke_zero_tolerance_only_dedupes():
+    points = [(0, 0), (0, 0), (1, 1), (1, 1), (2, 2)]
+    assert simplify_stroke(points, 0).tolist() == [[0, 0], [1, 1], [2, 2]]
+
+
+# --- path buffer ---
+
+def test_path_buffer_drop():
+    buffer = PathBuffer([[(0, 0), (1, 1), (2, 2)], [(3, 3), (4, 4)]])
+    buffer.extend([(5, 5)])
+    buffer.drop(2)
+    assert buffer.tolist() == [(2, 2), (3, 3), (4, 4), (5, 5)]
+    assert buffer.stroke_ends.tolist() == [1, 3]
+    assert buffer.open_stroke.tolist() == [[5, 5]]
+    buffer.drop(3)
+    assert buffer.stroke_count == 0
+    assert buffer.tolist() == [(5, 5)]
+
+
+def test_path_buffer_drop_keeps_pens():
+    buffer = PathBuffer(pen=True)
+    for k in range(5):
+        buffer.append(k, k, k % 2)
+    buffer.drop(3)
+    assert buffer.tolist() == [(3.0, 3.0, 1), (4.0, 4.0, 0)]
+
+
+def test_path_buffer_prefix():
+    buffer = PathBuffer([[(0, 0), (1, 1)], [(2, 2)], [(3, 3), (4, 4)]])
+    prefix = buffer.prefix(2)
+    assert prefix.tolist() == [(0, 0), (1, 1), (2, 2)]
+    assert [stroke.tolist() for stroke in prefix.strokes()] == [[[0, 0], [1, 1]], [[2, 2]]]
+    assert not prefix.points.flags.writeable
+    # growing either one leaves the other alone
+    buffer.add_stroke([(5, 5)] * 100)
+    prefix.add_stroke([(9, 9)])
+    assert buffer.prefix(2).tolist() == [(0, 0), (1, 1), (2, 2)]
+    assert prefix.tolist()[-1] == (9, 9) and len(prefix) == 4
+
+
+# --- motion model ---
+
+def test_motion_timeline_matches_stepped_vector():
+    robot = Robot()
+    robot.init_vector_drawing(random_strokes(15, seed=6))
+    total = robot.vector_motion.total_ticks
+    ticks = 0
+    while not robot.is_vector_complete():
+        robot.update_vector()
+        ticks += 1
+    assert ticks == total
+
+
+def test_motion_timeline_positions():
+    timeline = MotionTimeline([(0, 0), (30, 40), (30, 40)], speed=5)
+    # one tick for the first point, 50px at 5px a tick plus the snap, one tick standing still
+    assert timeline.ticks.tolist() == [1, 11, 1]
+    assert timeline.total_ticks == 13
+    assert timeline.position_at(6) == pytest.approx((15.0, 20.0))
+
+
+def test_raster_seek_after_completion_keeps_plan(monkeypatch):
+    robot = Robot()
+    img_arr = np.random.default_rng(7).integers(0, 256, (12, 12, 3), dtype=np.uint8)
+    robot.start_raster(img_arr)
+    plan = robot.raster_plan
+    total = robot.raster_total_ticks(img_arr)
+    robot.seek_raster(img_arr, total)
+    assert robot.is_raster_complete(img_arr)
+
+    # RIGHT and END on a finished raster replay it with the plan already on screen
+    monkeypatch.setattr(robot, "plan_raster", lambda img_arr: pytest.fail("raster planned again"))
+    robot.seek_raster(img_arr, robot.raster_tick + SEEK_STEP)
+    robot.seek_raster(img_arr, total // 2)
+    robot.seek_raster(img_arr, total)
+    assert robot.raster_plan is plan
+    assert robot.is_raster_complete(img_arr)
+
+
+def test_text_eta_matches_stepped_ticks():
+    text_robot = TextRobot(Robot(), TextEngine(spacing=10, scale=1.5))
+    text_robot.start(" ".join(["THE QUICK BROWN FOX"] * 20))
+    planned = round(text_robot.eta() * FPS)
+    ticks = 0
+    while not text_robot.is_complete():
+        text_robot.update()
+        ticks += 1
+    assert ticks == planned
+    assert text_robot.page == text_robot.page_count - 1 > 0
+
+
+def test_text_seek_matches_stepping():
+    def robot():
+        text_robot = TextRobot(Robot(), TextEngine(spacing=10, scale=1.5))
+        text_robot.start(" ".join(["THE QUICK BROWN FOX"] * 20))
+        return text_robot
+    stepped, seeked = robot(), robot()
+    for _ in range(9000):
+        stepped.update()
+    seeked.seek(9000)
+    assert (seeked.tick, seeked.page, seeked.reached_tick) == (stepped.tick, stepped.page, stepped.reached_tick)
+    assert (seeked.robot.x, seeked.robot.y) == pytest.approx((stepped.robot.x, stepped.robot.y))
+    ink = [pygame.surfarray.array_alpha(robot.ink.surface) for robot in (stepped, seeked)]
+    assert np.array_equal(*ink) and ink[0].any()
+
+
+def cooperative_robot(num_robots, collision_avoidance):
+    cooperative = CooperativeRobot(pygame.Surface((WIDTH, HEIGHT)), TextEngine(spacing=10, scale=1.5), num_robots)
+    cooperative.set_text("THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG " * 8)
+    if not collision_avoidance:
+        cooperative.planner = None
+    return cooperative
+
+
+def cooperative_state(cooperative):
+    ink = [int(pygame.surfarray.array_alpha(layer.surface).sum()) for layer in cooperative.inks]
+    robots = [(robot.x, robot.y) for robot in cooperative.robots]
+    return (cooperative.total_ticks, cooperative.page, cooperative.indices, cooperative.busy_ticks,
+            cooperative.idle_ticks, cooperative.steals, cooperative.robot_chars, ink), robots
+
+
+@pytest.mark.parametrize("num_robots", [2, 5])
+def test_cooperative_jump_matches_stepping(num_robots):
+    stepped, jumped = cooperative_robot(num_robots, False), cooperative_robot(num_robots, False)
+    for tick in (1, 333, 2500, 2500, 9000):
+        while stepped.total_ticks < tick and not stepped.is_complete():
+            stepped.update()
+        jumped.fast_forward(tick - jumped.total_ticks)
+        state, robots = cooperative_state(jumped)
+        expected_state, expected_robots = cooperative_state(stepped)
+        assert state == expected_state
+        assert np.allclose(robots, expected_robots)
+    jumped.finish()
+    while not stepped.is_complete():
+        stepped.update()
+    assert cooperative_state(jumped)[0] == cooperative_state(stepped)[0]
+
+
+def test_cooperative_skip_with_collision_avoidance_spreads_over_frames():
+    cooperative = cooperative_robot(3, True)
+    cooperative.fast_forward(SEEK_STEP)
+    assert cooperative.total_ticks == 0
+    frames = 0
+    while cooperative.total_ticks < SEEK_STEP:
+        cooperative.advance(budget=0.001)
+        frames += 1
+    assert cooperative.total_ticks == SEEK_STEP
+    assert frames < SEEK_STEP
+    cooperative.finish()
+    while not cooperative.is_complete():
+        cooperative.advance(budget=0.05)
+    assert cooperative.eta() == 0
+
+
+def test_text_leading_whitespace():
+    text_robot = TextRobot(Robot(), TextEngine(spacing=10, scale=1.5))
+    text_robot.start(" " * 600 + "HI")
+    assert text_robot.page_count == 1
+    text_robot.finish()
+    assert text_robot.is_complete()